@@ -1,190 +1,843 @@
+import argparse
+import contextlib
+import copy
+import gzip
+import hashlib
+import importlib.util
+import json
+import multiprocessing
+import multiprocessing.connection
 import os
+import pickle
+import queue
+import sys
+import threading
+import time
+import traceback
+import tracemalloc
+from bisect import bisect_left, bisect_right
+from collections import deque, namedtuple
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, wait
 from re import sub
-import tkinter
-from tkinter import filedialog
-
-import mhrc.automation
-import numpy as np
-import pandapower as pp
-import pandas as pd
-import xlsxwriter
-from tktooltip import ToolTip
-import networkx as nx
-
-
-# initialization of all component lists
-def find_components():
-    global bus_list
-    global wire_list
-    global meter_list
-    global pin_list
-    global trafo_list
-    global load_list
-    global gen_list
-    global tline_list
-    global cable_list
-    global cap_list
-
-    bus_list = main.find_all("Bus")
-    wire_list = main.find_all("WireOrthogonal")
-    meter_list = main.find_all("master:multimeter")
-    pin_list = main.find_all("master:pin")
-    trafo_list = main.find_all("master:xfmr-3p2w")
-    load_list = main.find_all("master:fixed_load")
-    gen_list = main.find_all("master:source3") + main.find_all("master:source_3")
-    tline_list = main.find_all("TLine")
-    cable_list = main.find_all("Cable")
-    cap_list = main.find_all("master:capacitor")
-
-
-# get bus from node location
-def get_bus(loc):
+
+
+# module that is imported on first use of one of its attributes, so the heavy dependencies don't slow down the start of
+# the gui
+class LazyModule:
+    def __init__(self, name):
+        self._name = name
+        self._module = None
+
+    def __getattr__(self, attribute):
+        if self._module is None:
+            self._module = importlib.import_module(self._name)
+        return getattr(self._module, attribute)
+
+
+mhrc_automation = LazyModule("mhrc.automation")
+np = LazyModule("numpy")
+pp = LazyModule("pandapower")
+pd = LazyModule("pandas")
+xlsxwriter = LazyModule("xlsxwriter")
+nx = LazyModule("networkx")
+sparse = LazyModule("scipy.sparse")
+csgraph = LazyModule("scipy.sparse.csgraph")
+# only the gui needs tkinter, headless runs and batch workers also work without it
+tkinter = LazyModule("tkinter")
+filedialog = LazyModule("tkinter.filedialog")
+
+
+# calls to the PSCAD automation library made through component snapshots and reads served by the snapshots
+rpc_calls = {"find_all": 0, "get_parameters": 0, "get_port_location": 0, "set_parameters": 0}
+snapshot_reads = {"get_parameters": 0, "get_port_location": 0}
+
+# report of the current run with wall time, peak memory and PSCAD calls per stage
+run_report = {"stages": []}
+# called with ("start", name) when a stage starts and ("done", record) when it's finished, used by the gui to show the
+# progress of a run
+stage_listener = None
+# set to stop a run before its next stage
+cancel_event = threading.Event()
+
+
+# raised at the start of a stage if the run was cancelled
+class RunCancelled(Exception):
+    pass
+
+
+# starts a new run report and resets the counters of PSCAD calls. Memory is only traced if asked for, tracing slows
+# down the run and distorts the stage times, mostly of stages that import modules
+def start_run_report(trace_memory=False):
+    global run_report
+    run_report = {"started": time.strftime("%Y-%m-%d %H:%M:%S"), "stages": []}
+    reset_rpc_counters()
+    if trace_memory and not tracemalloc.is_tracing():
+        tracemalloc.start()
+
+
+# records wall time, peak memory if it's traced and PSCAD calls of a stage of the run. Stages that raise an error are
+# recorded too. If the run was cancelled, the stage isn't started
+@contextlib.contextmanager
+def stage(name):
+    if cancel_event.is_set():
+        raise RunCancelled("Run cancelled before " + name)
+    if stage_listener is not None:
+        stage_listener(("start", name))
+
+    calls = dict(rpc_calls)
+    if tracemalloc.is_tracing():
+        tracemalloc.reset_peak()
+    start = time.perf_counter()
     try:
-        return g.nodes[loc]["bus"]
-    except:
-        intersect(loc, loc)
-        return g.nodes[loc]["bus"]
-
-
-# sets bus attributes for a given node
-def update_node_with_bus(node):
-    connected_nodes = list(nx.node_connected_component(g, node))
-    bus_name = ""
-    # find one node that has a bus attribute, assign that to all other connected nodes
-    for cn in connected_nodes:
-        if g.nodes[cn]["bus"]:
-            bus_name = g.nodes[cn]["bus"]
-            break
+        yield
+    finally:
+        record = {"name": name, "seconds": time.perf_counter() - start, "peak_memory_mb": None,
+                  "rpc_calls": {key: rpc_calls[key] - calls[key] for key in rpc_calls if rpc_calls[key] != calls[key]}}
+        if tracemalloc.is_tracing():
+            record["peak_memory_mb"] = tracemalloc.get_traced_memory()[1] / 1E6
+        run_report["stages"].append(record)
+        if stage_listener is not None:
+            stage_listener(("done", record))
+
+
+# writes the run report next to the project, together with the PSCAD calls of the whole run and the sizes of the
+# graph and the PandaPower network. Stops tracing memory
+def write_run_report():
+    if tracemalloc.is_tracing():
+        tracemalloc.stop()
+    run_report["total_seconds"] = sum(record["seconds"] for record in run_report["stages"])
+    run_report["rpc_calls"] = dict(rpc_calls)
+    run_report["snapshot_reads"] = dict(snapshot_reads)
+    if globals().get("g") is not None:
+        run_report["graph"] = {"nodes": g.number_of_nodes(), "edges": g.number_of_edges(),
+                               "labelled_nodes": len(node_bus)}
+    if "net" in globals():
+        run_report["net"] = {element: len(net[element]) for element in
+                             ("bus", "line", "trafo", "load", "gen", "ext_grid", "shunt")}
+
+    with open(os.path.join(directory, project_name + "_run_report.json"), "w") as fp:
+        json.dump(run_report, fp, indent=2, default=str)
+
+    print("Run report: " + ", ".join("%s %.2f s" % (record["name"], record["seconds"])
+                                     for record in run_report["stages"]))
+
+
+# snapshot of a PSCAD component. Parameters, port locations and geometry are fetched from PSCAD once, all later reads are
+# served from the snapshot
+class ComponentSnapshot:
+    def __init__(self, component):
+        self.component = component
+        self._id = component._id
+        self._parameters = None
+        self._port_locations = {}
+        self._definition = None
+        self._location = None
+        self._vertices = None
+
+    @property
+    def location(self):
+        if self._location is None:
+            self._location = self.component.location
+        return self._location
+
+    @property
+    def vertices(self):
+        if self._vertices is None:
+            self._vertices = self.component.vertices
+        return self._vertices
+
+    def get_definition(self):
+        if self._definition is None:
+            self._definition = str(self.component.get_definition())
+        return self._definition
+
+    def get_parameters(self):
+        snapshot_reads["get_parameters"] += 1
+        if self._parameters is None:
+            rpc_calls["get_parameters"] += 1
+            self._parameters = self.component.get_parameters()
+        return self._parameters
+
+    def get_port_location(self, port):
+        snapshot_reads["get_port_location"] += 1
+        if port not in self._port_locations:
+            rpc_calls["get_port_location"] += 1
+            self._port_locations[port] = self.component.get_port_location(port)
+        return self._port_locations[port]
+
+    # writes parameters to PSCAD. The cached parameters are dropped, so they get fetched again on the next read
+    def set_parameters(self, **parameters):
+        rpc_calls["set_parameters"] += 1
+        self.component.set_parameters(**parameters)
+        self._parameters = None
+
+
+# component of a canvas snapshot file. Offers the same parts of the PSCAD component interface as ComponentSnapshot,
+# so the network can be built without PSCAD
+class OfflineComponent:
+    def __init__(self, data):
+        self._id = tuple(data["id"])
+        self.location = tuple(data["location"])
+        self.vertices = [tuple(vertex) for vertex in data.get("vertices", [])]
+        self._definition = data.get("definition", "")
+        self._parameters = data.get("parameters", {})
+        self._port_locations = {port: tuple(location) for port, location in data.get("ports", {}).items()}
+        self.canvas_name = data.get("canvas", "Main")
+        self.page = data.get("page", "Main")
+
+    def get_definition(self):
+        return self._definition
+
+    def get_parameters(self):
+        return self._parameters
+
+    def get_port_location(self, port):
+        return self._port_locations[port]
+
+    def set_parameters(self, **parameters):
+        self._parameters.update({key: str(value) for key, value in parameters.items()})
+
+
+# component on the page of a module instance. Wraps the snapshot of the component in the module definition, which is
+# shared by all instances of the module, and moves it into the coordinates of the page. Every page gets its own range
+# of y coordinates, so the components of all pages fit into one graph. The page is added to the id
+class PageComponent:
+    def __init__(self, component, page, canvas_name, offset):
+        self.component = component
+        self.page = page
+        self.canvas_name = canvas_name
+        self.offset = offset
+        self._id = tuple(component._id) + (page,)
+
+    @property
+    def location(self):
+        return self.component.location[0] + self.offset[0], self.component.location[1] + self.offset[1]
+
+    @property
+    def vertices(self):
+        return self.component.vertices
+
+    def get_definition(self):
+        return self.component.get_definition()
+
+    def get_parameters(self):
+        return self.component.get_parameters()
+
+    def get_port_location(self, port):
+        x, y = self.component.get_port_location(port)
+        return x + self.offset[0], y + self.offset[1]
+
+    def set_parameters(self, **parameters):
+        self.component.set_parameters(**parameters)
+
+
+# puts the components of a canvas on a page. Components of the main page are used as they are
+def place_on_page(components, page, canvas_name, offset):
+    if page == "Main":
+        return components
+    return [PageComponent(component, page, canvas_name, offset) for component in components]
+
+
+# name of a bus, node or element on a page. Names on module pages get the page path in front, so every instance of a
+# module has its own buses and elements
+def page_name(page, name):
+    return name if page == "Main" else page + "/" + str(name)
+
+
+# name of a bus component, qualified with its page
+def page_bus_name(bus):
+    return page_name(getattr(bus, "page", "Main"), bus.get_parameters()["Name"])
+
+
+# id of a component on its canvas. All instances of a module share the components of its canvas
+def canvas_id(component):
+    if getattr(component, "page", "Main") == "Main":
+        return "Main", tuple(component._id)
+    return component.canvas_name, tuple(component._id)[:-1]
 
-    for cn in connected_nodes:
-        g.nodes[cn]["bus"] = bus_name
 
+# connections between the ports of module instances and the ports on the pages of the modules
+page_links = []
 
-# adds intersection point as  between two lines as a new node into graph and connect it to both edges
-def intersect(p1, p2):
-    for edge in list(g.edges):
-        # vertical edge
-        if edge[0][0] == edge[1][0]:
-            if min(p1[0], p2[0]) <= edge[0][0] <= max(p1[0], p2[0]):
-                if min(edge[0][1], edge[1][1]) <= p1[1] <= max(edge[0][1], edge[1][1]):
-                    x = edge[0][0]
-                    y = p1[1]
-                    g.add_node((x, y), bus="")
-                    if (x, y) != edge[0]: g.add_edge((x, y), edge[0])
-                    if (x, y) != p1: g.add_edge((x, y), p1)
 
-                    update_node_with_bus((x, y))
+# parts of the components that go into a canvas snapshot, per component list. The ports of the sources depend on their
+# definition
+snapshot_contents = {
+    "bus_list": {"vertices": True, "parameters": True, "ports": ()},
+    "wire_list": {"vertices": True, "parameters": False, "ports": ()},
+    "meter_list": {"vertices": False, "parameters": False, "ports": ("A", "B")},
+    "pin_list": {"vertices": False, "parameters": False, "ports": ()},
+    "trafo_list": {"vertices": False, "parameters": True, "ports": ("N1", "N2")},
+    "load_list": {"vertices": False, "parameters": True, "ports": ("IA",)},
+    "gen_list": {"vertices": False, "parameters": True, "ports": None},
+    "tline_list": {"vertices": False, "parameters": True, "ports": ()},
+    "cable_list": {"vertices": False, "parameters": True, "ports": ()},
+    "cap_list": {"vertices": False, "parameters": True, "ports": ("A", "B")},
+}
+
+
+# returns the ports of a component that go into a canvas snapshot
+def component_ports(list_name, component):
+    ports = snapshot_contents[list_name]["ports"]
+    if ports is None:
+        ports = ("N3",) if component.get_definition() == "master:source3" else ("N",)
+    return ports
+
+
+# returns a component of a list in the format of a canvas snapshot
+def component_data(list_name, component):
+    contents = snapshot_contents[list_name]
+    data = {"id": list(component._id), "location": list(component.location)}
+    if contents["vertices"]:
+        data["vertices"] = [list(vertex) for vertex in component.vertices]
+    if contents["parameters"]:
+        data["parameters"] = dict(component.get_parameters())
+
+    if contents["ports"] is None:
+        data["definition"] = component.get_definition()
+    data["ports"] = {port: list(component.get_port_location(port))
+                     for port in component_ports(list_name, component)}
+
+    canvas_name = getattr(component, "canvas_name", "Main")
+    if canvas_name != "Main":
+        data["canvas"] = canvas_name
+        data["page"] = component.page
+
+    return data
+
+
+# returns the contents of all component lists in the format of a canvas snapshot
+def canvas_components():
+    return {list_name: [component_data(list_name, component) for component in globals()[list_name]]
+            for list_name in snapshot_contents}
+
+
+# writes all component lists into a gzipped json file that can be used instead of PSCAD
+def export_canvas_snapshot(snapshot_file, fortran_version):
+    snapshot = {"project_name": project_name, "fortran_version": fortran_version, "components": canvas_components(),
+                "page_links": page_links}
+    with gzip.open(snapshot_file, "wt") as fp:
+        json.dump(snapshot, fp, separators=(",", ":"), default=int)
+
 
-        # horizontal edge
+# reads a canvas snapshot file and sets up the component lists from it. Returns the snapshot
+def load_canvas_snapshot(snapshot_file):
+    with gzip.open(snapshot_file, "rt") as fp:
+        snapshot = json.load(fp)
+
+    for list_name in snapshot_contents:
+        globals()[list_name] = [OfflineComponent(data) for data in snapshot["components"][list_name]]
+    globals()["page_links"] = [(tuple(outer), tuple(inner)) for outer, inner in snapshot.get("page_links", [])]
+
+    return snapshot
+
+
+# resets the counters of PSCAD calls and snapshot reads
+def reset_rpc_counters():
+    for counters in (rpc_calls, snapshot_reads):
+        for key in counters:
+            counters[key] = 0
+
+
+# prints how many PSCAD calls were made and how many reads the snapshots served
+def print_rpc_counters():
+    for key in rpc_calls:
+        if key in snapshot_reads:
+            print("%s: %d PSCAD calls for %d reads" % (key, rpc_calls[key], snapshot_reads[key]))
+        else:
+            print("%s: %d PSCAD calls" % (key, rpc_calls[key]))
+
+
+# lists all components of a canvas in one call to PSCAD and counts the call
+def find_all(canvas):
+    rpc_calls["find_all"] += 1
+    return list(canvas.find_all())
+
+
+# classes of the PSCAD automation library for components without a definition, with the names find_all filtered them by
+automation_classes = {"Bus": "Bus", "Wire": "WireOrthogonal", "WireOrthogonal": "WireOrthogonal", "TLine": "TLine",
+                      "Cable": "Cable"}
+
+
+# name of the definition of a PSCAD component, like master:source3. Buses, wires, lines and cables are identified by
+# their automation class, the most specific one counts. User components carry their definition in defn_name
+def definition_name(component):
+    for component_class in type(component).__mro__:
+        if component_class.__name__ in automation_classes:
+            return automation_classes[component_class.__name__]
+
+    try:
+        name = component.defn_name
+    except AttributeError:
+        try:
+            name = component.get_definition()
+        except AttributeError:
+            return type(component).__name__
+    if isinstance(name, tuple):
+        return ":".join(name)
+    return str(name)
+
+
+# PSCAD definitions of the components in each component list
+component_definitions = {"bus_list": ("Bus",), "wire_list": ("WireOrthogonal",), "meter_list": ("master:multimeter",),
+                         "pin_list": ("master:pin",), "trafo_list": ("master:xfmr-3p2w",),
+                         "load_list": ("master:fixed_load",), "gen_list": ("master:source3", "master:source_3"),
+                         "tline_list": ("TLine",), "cable_list": ("Cable",), "cap_list": ("master:capacitor",)}
+
+# component list of each PSCAD definition
+definition_lists = {definition: list_name for list_name, definitions in component_definitions.items()
+                    for definition in definitions}
+
+# range of y coordinates of each page, larger than any canvas
+page_offset = 10 ** 7
+
+
+# checks if a component is an instance of a module with its own canvas
+def is_module_instance(component):
+    try:
+        return component.is_module()
+    except AttributeError:
+        return False
+
+
+# finds the components of a canvas: the component lists, the ports of its module and the module instances placed on
+# it. The canvas is listed once and the components are sorted by their definition. All of them are wrapped into
+# snapshots that are shared by every instance of the module
+def fetch_canvas(canvas):
+    lists = {list_name: [] for list_name in component_definitions}
+    ports = []
+    modules = []
+    for component in find_all(canvas):
+        definition = definition_name(component)
+        snapshot = ComponentSnapshot(component)
+        snapshot._definition = definition
+
+        if definition in definition_lists:
+            lists[definition_lists[definition]].append(snapshot)
+        elif definition == "master:port":
+            ports.append(snapshot)
+        elif is_module_instance(component):
+            modules.append(snapshot)
+    return lists, ports, modules
+
+
+# initialization of all component lists. Walks through the main canvas and the pages of all module instances below it,
+# level by level. Every module definition is fetched only once, the canvases of a level can be fetched by several
+# workers. PSCAD projects use one worker, it's not verified that one PSCAD connection can be used by several threads.
+# The ports of each module instance get linked to the ports on its page, so all pages form one network
+def find_components(project, workers=1):
+    global page_links
+    lists = {list_name: [] for list_name in component_definitions}
+    page_links = []
+    # canvas name -> (component lists, ports, module instances)
+    canvases = {}
+    pages = 0
+
+    # pages of the current level: (page, canvas name, module instance on the parent page)
+    level = [("Main", "Main", None)]
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        while level:
+            canvas_names = list(dict.fromkeys(canvas_name for page, canvas_name, instance in level
+                                              if canvas_name not in canvases))
+            fetched = pool.map(fetch_canvas, [project.user_canvas(canvas_name) for canvas_name in canvas_names])
+            canvases.update(zip(canvas_names, fetched))
+            for canvas_name in canvas_names:
+                canvas_lists = canvases[canvas_name][0]
+                if canvas_lists["bus_list"] and not canvas_lists["wire_list"]:
+                    print("Warning: canvas %s has buses but no wires, check the component classes" % canvas_name)
+
+            next_level = []
+            for page, canvas_name, instance in level:
+                offset = (0, page_offset * pages)
+                pages += 1
+                canvas_lists, ports, modules = canvases[canvas_name]
+
+                for list_name, components in canvas_lists.items():
+                    lists[list_name] += place_on_page(components, page, canvas_name, offset)
+
+                # the port components on the page have the same name as the ports of the module instance
+                if instance is not None:
+                    for port in place_on_page(ports, page, canvas_name, offset):
+                        page_links.append((tuple(instance.get_port_location(port.get_parameters()["Name"])),
+                                           tuple(port.location)))
+
+                for module in place_on_page(modules, page, canvas_name, offset):
+                    module_canvas = module.get_definition().split(":")[-1]
+                    next_level.append(("%s/%s:%s" % (page, module_canvas, module._id[0]), module_canvas, module))
+
+            level = next_level
+
+    globals().update(lists)
+    print("Found components on %d pages of %d canvases" % (pages, len(canvases)))
+
+
+# labels all nodes with the name of the bus they are connected to. The connected components are computed once for the
+# whole graph on integer node indices. Components that are connected to more than one bus get reported, the last of
+# those buses is used for the whole component
+def label_buses(bus_ends):
+    global node_bus
+    global bus_conflicts
+    nodes = list(g.nodes)
+    node_index = {node: i for i, node in enumerate(nodes)}
+    edges = np.array([(node_index[u], node_index[v]) for u, v in g.edges], dtype=int).reshape(-1, 2)
+    adjacency = sparse.coo_matrix((np.ones(len(edges)), (edges[:, 0], edges[:, 1])), shape=(len(nodes), len(nodes)))
+    n_components, components = csgraph.connected_components(adjacency, directed=False)
+
+    component_bus = np.full(n_components, "", dtype=object)
+    component_bus_names = {}
+    for bus_end1, bus_end2, bus_name in bus_ends:
+        component = components[node_index[bus_end1]]
+        component_bus[component] = bus_name
+        component_bus_names.setdefault(component, [])
+        if bus_name not in component_bus_names[component]:
+            component_bus_names[component].append(bus_name)
+
+    bus_conflicts = [names for names in component_bus_names.values() if len(names) > 1]
+    warn_bus_conflicts()
+
+    node_bus = dict(zip(nodes, component_bus[components]))
+
+
+# reports buses that are connected to each other
+def warn_bus_conflicts():
+    for names in bus_conflicts:
+        print("Warning: buses " + ", ".join(names) + " are connected to each other. Using " + names[-1])
+
+
+# builds an index over all vertical and horizontal edges. vertical edges are bucketed by their x coordinate and
+# horizontal edges by their y coordinate. The bucket keys are kept sorted, so a lookup only visits the buckets that
+# can contain an intersection instead of walking every edge of the graph
+def build_segment_index(edges):
+    index = {"vertical": {}, "horizontal": {}}
+    for edge in edges:
+        # vertical edge, stored as (lower y, upper y, edge)
+        if edge[0][0] == edge[1][0]:
+            index["vertical"].setdefault(edge[0][0], []).append(
+                (min(edge[0][1], edge[1][1]), max(edge[0][1], edge[1][1]), edge))
+
+        # horizontal edge, stored as (left x, right x, edge)
         elif edge[0][1] == edge[1][1]:
-            if min(p1[1], p2[1]) <= edge[1][1] <= max(p1[1], p2[1]):
-                if min(edge[0][0], edge[1][0]) <= p1[0] <= max(edge[0][0], edge[1][0]):
-                    x = p1[0]
-                    y = edge[1][1]
-                    g.add_node((x, y), bus="")
-                    if (x, y) != edge[0]: g.add_edge((x, y), edge[0])
-                    if (x, y) != p1: g.add_edge((x, y), p1)
+            index["horizontal"].setdefault(edge[0][1], []).append(
+                (min(edge[0][0], edge[1][0]), max(edge[0][0], edge[1][0]), edge))
+
+    index["vertical_keys"] = sorted(index["vertical"])
+    index["horizontal_keys"] = sorted(index["horizontal"])
+    return index
+
+
+# returns all indexed edges of one orientation whose bucket key lies between lower and upper and whose extent covers
+# pos. For vertical edges the keys are x coordinates and pos is a y coordinate, for horizontal edges it's the other
+# way around
+def query_segment_index(index, orientation, lower, upper, pos):
+    keys = index[orientation + "_keys"]
+    edges = []
+    for key in keys[bisect_left(keys, lower):bisect_right(keys, upper)]:
+        for start, end, edge in index[orientation][key]:
+            if start <= pos <= end:
+                edges.append(edge)
+
+    return edges
+
+
+# finds the intersection points between the line p1-p2 and all indexed edges. Returns tuples of intersection point
+# and intersected edge
+def find_intersections(p1, p2):
+    intersections = []
+    # vertical edges
+    for edge in query_segment_index(segment_index, "vertical", min(p1[0], p2[0]), max(p1[0], p2[0]), p1[1]):
+        intersections.append(((edge[0][0], p1[1]), edge))
+
+    # horizontal edges
+    for edge in query_segment_index(segment_index, "horizontal", min(p1[1], p2[1]), max(p1[1], p2[1]), p1[0]):
+        intersections.append(((p1[0], edge[0][1]), edge))
+
+    return intersections
+
+
+# connects an intersection point to the intersected edge and to the start point of the intersecting line
+def add_intersection(node, edge, p1):
+    if node != edge[0]: g.add_edge(node, edge[0])
+    if node != p1: g.add_edge(node, p1)
+
+
+# bus names of component ports. keys holds (component id, port) and buses the bus of each port, which is empty for ports
+# that are on the network but not connected to a bus. unresolved holds the keys of ports that aren't on the network
+PortBuses = namedtuple("PortBuses", ["keys", "buses", "unresolved"])
+
+# component lists with ports that connect to buses
+port_lists = ("trafo_list", "load_list", "gen_list", "cap_list")
+
+
+# resolves the buses of all ports of all components in one batch. Every port location is looked up in node_bus, a
+# location that isn't a node is matched against the segment index and gets the bus of the edge it lies on. The graph is
+# only read, so the lookups don't depend on each other. Resolved locations are kept in location_bus, None for locations
+# that aren't on the network, and aren't looked up again
+def resolve_port_buses():
+    global segment_index
+    keys = []
+    locations = []
+    for list_name in port_lists:
+        for component in globals()[list_name]:
+            for port in component_ports(list_name, component):
+                keys.append((tuple(component._id), port))
+                locations.append(tuple(component.get_port_location(port)))
+
+    # every location gets looked up once, even if several ports share it
+    for location in dict.fromkeys(locations):
+        if location in location_bus:
+            continue
+
+        if location in node_bus:
+            location_bus[location] = node_bus[location]
+        else:
+            # the topology cache doesn't keep the segment index, it's only built when a new location needs it
+            if segment_index is None:
+                segment_index = build_segment_index(network_edges()[0])
+            edges = [edge for _, edge in find_intersections(location, location)]
+            location_bus[location] = node_bus.get(edges[-1][0], "") if edges else None
 
-                    update_node_with_bus((x, y))
+    buses = np.array([location_bus.get(location) for location in locations], dtype=object)
+    unresolved = [key for key, bus in zip(keys, buses) if bus is None]
+    return PortBuses(keys, buses, unresolved)
 
 
-# creates a graph from wires and certain components from PSCAD.
-def create_network_graph():
-    global g
-    g = nx.Graph()
+# returns the bus of the first port of a component that is on the network
+def get_port_bus(component, *ports):
+    for port in ports:
+        if (tuple(component._id), port) in port_bus:
+            return port_bus[(tuple(component._id), port)]
+    raise KeyError("component %s isn't connected to the network at port %s" % (component._id, " or ".join(ports)))
+
 
-    # add wire vertices as nodes and wires as edges
+# returns the edges of the wires, multimeters and buses on the canvas and the ends of every bus with its name
+def network_edges():
+    edges = []
+
+    # wire vertices as nodes and wires as edges
     for wire in wire_list:
         for i in range(0, len(wire.vertices) - 1):
             node1 = tuple(np.add(wire.location, wire.vertices[i]))
             node2 = tuple(np.add(wire.location, wire.vertices[i + 1]))
-            g.add_node(node1, bus="")
-            g.add_node(node2, bus="")
-            g.add_edge(node1, node2)
+            edges.append((node1, node2))
 
-    # add nodes and edges for multimeters
+    # nodes and edges for multimeters
     for meter in meter_list:
-        node1, node2 = meter.get_port_location("A"), meter.get_port_location("B")
-        g.add_node(node1, bus="")
-        g.add_node(node2, bus="")
-        g.add_edge(node1, node2)
+        edges.append((tuple(meter.get_port_location("A")), tuple(meter.get_port_location("B"))))
 
-    # add buses as nodes and edges. Search for connected nodes and assign them the proper bus attribute
+    # buses as nodes and edges
+    bus_ends = []
     for bus in bus_list:
         # upper left end of bus
         bus_end1 = min(bus.location, tuple(np.add(bus.location, bus.vertices[1])))
         # lower right end of bus
         bus_end2 = max(bus.location, tuple(np.add(bus.location, bus.vertices[1])))
 
-        bus_name = bus.get_parameters()["Name"]
+        bus_name = page_bus_name(bus)
 
-        g.add_node(bus_end1, bus=bus_name)
-        g.add_node(bus_end2, bus=bus_name)
-        g.add_edge(bus_end1, bus_end2)
+        edges.append((bus_end1, bus_end2))
+        bus_ends.append((bus_end1, bus_end2, bus_name))
 
-        intersect(bus_end1, bus_end2)
+    return edges, bus_ends
 
-        # get all nodes that are also connected to it and set the bus tag
-        connected_nodes = list(nx.node_connected_component(g, bus_end1))
-        for cn in connected_nodes:
-            g.nodes[cn]["bus"] = bus_name
 
-    # check if any nodes are connected to an edge. If they are, add a new connection a one of the nodes of that edge
-    for node in g.nodes:
-        # node that's not connected directly to a bus
-        if not g.nodes[node]["bus"]:
-            intersect(node, node)
+# creates a graph from wires and certain components from PSCAD.
+def create_network_graph(edges, bus_ends):
+    global g
+    global segment_index
+    global location_bus
+    g = nx.Graph()
+    g.add_edges_from(edges)
+
+    # port locations resolved on this graph
+    location_bus = {}
 
-    # check if there are any master pins and add them as new nodes into the graph
+    # index all wire, meter and bus edges. Intersection edges added below lie on these edges, so the index doesn't
+    # have to be updated while the junctions get resolved
+    segment_index = build_segment_index(g.edges)
+
+    # connections between module instances and their pages. They aren't indexed, nothing can be placed on them
+    for outer, inner in page_links:
+        g.add_edge(outer, inner)
+
+    # master pins are nodes that connect to every edge they are placed on
     for pin in pin_list:
         x, y = pin.location
-        g.add_node((x, y), bus="")
-        for edge in g.edges:
-            # vertical edge
-            if edge[0][0] == edge[1][0] == x:
-                if min(edge[0][1], edge[1][1]) <= y <= max(edge[0][1], edge[1][1]):
-                    g.add_edge((x, y), edge[0])
+        g.add_node((x, y))
+
+    # resolve all junctions in one batch. Buses connect to every edge crossing them, every other node connects to
+    # the edges it lies on
+    intersections = []
+    for bus_end1, bus_end2, bus_name in bus_ends:
+        intersections += [(node, edge, bus_end1) for node, edge in find_intersections(bus_end1, bus_end2)]
+    for node in g.nodes:
+        intersections += [(node, edge, node) for _, edge in find_intersections(node, node)]
 
-            # horizontal edge
-            elif edge[0][1] == edge[1][1] == y:
-                if min(edge[0][0], edge[1][0]) <= x <= max(edge[0][0], edge[1][0]):
-                    g.add_edge((x, y), edge[0])
+    for node, edge, p1 in intersections:
+        add_intersection(node, edge, p1)
 
-        update_node_with_bus((x, y))
+    # all edges are known now, assign the bus names to the nodes
+    label_buses(bus_ends)
+
+
+# resolves the buses of all component ports and keeps them for the element creation. Ports that aren't on the network
+# raise a KeyError when an element gets connected through them
+def resolve_ports():
+    global port_buses
+    global port_bus
+    port_buses = resolve_port_buses()
+    port_bus = {key: bus for key, bus in zip(port_buses.keys, port_buses.buses) if bus is not None}
+    # unresolved ports only matter if they are used, like the grounded side of a capacitor they usually aren't
+    run_report["unresolved_ports"] = len(port_buses.unresolved)
+
+
+# file of the topology cache, the bus of every node and port location of the canvas geometry it was built from
+def topology_cache_file():
+    return os.path.join(directory, project_name + "_topology.json.gz")
+
+
+# stable hash of the canvas geometry the buses of the nodes depend on: wire vertices, multimeter ports, bus ends and
+# names, pin locations and the links between pages. The buses stay in canvas order, it decides which bus wins if
+# buses are connected to each other
+def topology_hash(edges, bus_ends):
+    geometry = {"edges": sorted(sorted(edge) for edge in edges), "buses": bus_ends,
+                "pins": sorted(tuple(pin.location) for pin in pin_list), "page_links": sorted(page_links)}
+    return hashlib.sha256(json.dumps(geometry, default=int).encode()).hexdigest()
+
+
+# takes the buses of all nodes and port locations from the topology cache if it was saved for the same geometry.
+# Returns False if there is no cache for it
+def load_topology_cache(key):
+    global g
+    global segment_index
+    global node_bus
+    global location_bus
+    global bus_conflicts
+    try:
+        with gzip.open(topology_cache_file(), "rt") as fp:
+            cache = json.load(fp)
+    except (FileNotFoundError, ValueError):
+        return False
+
+    if cache.get("key") != key:
+        return False
+
+    # there is no graph, the segment index gets built if a port location isn't in the cache
+    g = None
+    segment_index = None
+    node_bus = {(x, y): bus for x, y, bus in cache["node_bus"]}
+    location_bus = {(x, y): bus for x, y, bus in cache["location_bus"]}
+    bus_conflicts = cache["bus_conflicts"]
+    warn_bus_conflicts()
+    return True
+
+
+# saves the buses of all nodes and port locations with the hash of the geometry they were resolved for
+def save_topology_cache(key):
+    with gzip.open(topology_cache_file(), "wt") as fp:
+        json.dump({"key": key, "node_bus": [[x, y, bus] for (x, y), bus in node_bus.items()],
+                   "location_bus": [[x, y, bus] for (x, y), bus in location_bus.items()],
+                   "bus_conflicts": bus_conflicts}, fp, separators=(",", ":"), default=int)
+
+
+# names in the manual input sheets are either PSCAD names or component ids. Excel returns ids as int or float depending on
+# the column, so names are compared as strings and integer floats are converted to int first
+def manual_input_key(name):
+    if isinstance(name, (float, np.floating)) and float(name).is_integer():
+        name = int(name)
+    return str(name).strip()
+
+
+# manual inputs from man_input.xlsx. All sheets are read at once and indexed by name. A pickled copy of the index is
+# kept next to the xlsx file and used until the xlsx file changes
+class ManualInputStore:
+    def __init__(self, filename):
+        # sheet -> name -> column -> value, empty cells are left out
+        self.sheets = {}
+
+        try:
+            stat = os.stat(filename)
+        except FileNotFoundError:
+            return
+        stamp = (stat.st_mtime_ns, stat.st_size)
+
+        cachefile = os.path.splitext(filename)[0] + ".pkl"
+        try:
+            with open(cachefile, "rb") as fp:
+                cached_stamp, sheets = pickle.load(fp)
+            if cached_stamp == stamp:
+                self.sheets = sheets
+                return
+        except (FileNotFoundError, EOFError, ValueError, pickle.UnpicklingError):
+            pass
+
+        for sheet_name, df in pd.read_excel(filename, sheet_name=None).items():
+            self.sheets[sheet_name] = {}
+            for row in df.to_dict("records"):
+                if "Name" in row and not pd.isna(row["Name"]):
+                    self.sheets[sheet_name][manual_input_key(row["Name"])] = {
+                        column: value for column, value in row.items() if column != "Name" and not pd.isna(value)}
+
+        with open(cachefile, "wb") as fp:
+            pickle.dump((stamp, self.sheets), fp)
+
+    # returns a value from the manual input, or default if there is none
+    def get(self, sheet, name, column, default=None):
+        return self.sheets.get(sheet, {}).get(manual_input_key(name), {}).get(column, default)
 
 
 # gets pandapower bus index from name for easier referencing
 def get_bus_index(name):
-    return pp.get_element_index(net=net, element_type="bus", name=str(name))
+    return bus_index[str(name)]
+
+
+# turns a list of rows with the same keys into a dict of columns for the bulk creation functions of pandapower
+def to_columns(rows):
+    return {key: [row[key] for row in rows] for key in rows[0]}
 
 
 # creates buses in pandapower with values from pscad
 def create_buses_from_pscad():
+    global bus_index
+    vn_kv = []
+    names = []
+    indices = []
     for bus in bus_list:
-        vn_kv = float(bus.get_parameters()["BaseKV"].split("[")[0].replace(" ", ""))
-        name = bus.get_parameters()["Name"]
+        vn_kv.append(float(bus.get_parameters()["BaseKV"].split("[")[0].replace(" ", "")))
+        names.append(page_bus_name(bus))
 
-        if sim_bus_var.get():
-            index = int(sub("\D", "", name))
-        else:
-            index = None
+        # buses on module pages share their PSCAD names between the instances, they are numbered after the others
+        if settings["similar_bus_indices"]:
+            if getattr(bus, "page", "Main") == "Main":
+                indices.append(int(sub("\D", "", names[-1])))
+            else:
+                indices.append(None)
 
-        pp.create_bus(net=net, vn_kv=vn_kv, index=index, name=name)
+    if None in indices:
+        first = max([index for index in indices if index is not None], default=-1) + 1
+        module_buses = [i for i, index in enumerate(indices) if index is None]
+        for n, i in enumerate(module_buses):
+            indices[i] = first + n
 
+    if names:
+        indices = pp.create_buses(net=net, nr_buses=len(names), vn_kv=vn_kv, index=indices or None, name=names)
+
+    # bus names with their pandapower index, used to connect all other elements
+    bus_index = dict(zip(names, indices))
 
-# creates trafos in pandapower with values from pscad
-def create_trafos_from_pscad():
-    try:
-        df = pd.read_excel(directory + "\\" + "man_input.xlsx", sheet_name="trafo")
-    except FileNotFoundError:
-        df = pd.DataFrame()
 
-    for trafo in trafo_list:
+# creates trafos in pandapower with values from pscad. Only the given trafos are created if there are any
+def create_trafos_from_pscad(trafos=None):
+    if trafos is None:
+        trafos = trafo_list
+
+    rows = []
+    for trafo in trafos:
         # check if a name exists, if it does use it, otherwise use cmp id
         if trafo.get_parameters()["Name"]:
             name = trafo.get_parameters()["Name"]
         else:
             name = str(trafo._id[0])
+        name = page_name(getattr(trafo, "page", "Main"), name)
 
         # set winding types
         if trafo.get_parameters()["YD1"] == "0":
@@ -205,19 +858,8 @@ def create_trafos_from_pscad():
 
         # check which side is the low voltage side and set voltages and winding types for both sides
         if v1 < v2:
-            if not df.empty:
-                if not pd.isna(df.at[df[df["Name"] == name].index[0], "lv_bus"]):
-                    lv_bus = get_bus_index(df.at[df[df["Name"] == name].index[0], "lv_bus"])
-                else:
-                    lv_bus = get_bus_index(get_bus(trafo.get_port_location("N1")))
-                if not pd.isna(df.at[df[df["Name"] == name].index[0], "hv_bus"]):
-                    lv_bus = get_bus_index(df.at[df[df["Name"] == name].index[0], "hv_bus"])
-                else:
-                    hv_bus = get_bus_index(get_bus(trafo.get_port_location("N2")))
-            else:
-                lv_bus = get_bus_index(get_bus(trafo.get_port_location("N1")))
-                hv_bus = get_bus_index(get_bus(trafo.get_port_location("N2")))
-
+            lv_port = "N1"
+            hv_port = "N2"
             vn_hv_kv = v2
             vn_lv_kv = v1
             vector_group = winding_2.upper() + winding_1.lower()
@@ -231,19 +873,8 @@ def create_trafos_from_pscad():
                 tap_side = ""
 
         else:
-            if not df.empty:
-                if not pd.isna(df.at[df[df["Name"] == name].index[0], "lv_bus"]):
-                    lv_bus = get_bus_index(df.at[df[df["Name"] == name].index[0], "lv_bus"])
-                else:
-                    lv_bus = get_bus_index(get_bus(trafo.get_port_location("N2")))
-                if not pd.isna(df.at[df[df["Name"] == name].index[0], "hv_bus"]):
-                    lv_bus = get_bus_index(df.at[df[df["Name"] == name].index[0], "hv_bus"])
-                else:
-                    hv_bus = get_bus_index(get_bus(trafo.get_port_location("N1")))
-            else:
-                lv_bus = get_bus_index(get_bus(trafo.get_port_location("N2")))
-                hv_bus = get_bus_index(get_bus(trafo.get_port_location("N1")))
-
+            lv_port = "N2"
+            hv_port = "N1"
             vn_hv_kv = v1
             vn_lv_kv = v2
             vector_group = winding_1.upper() + winding_2.lower()
@@ -256,6 +887,17 @@ def create_trafos_from_pscad():
             else:
                 tap_side = ""
 
+        # use buses from manual input sheet. If there are none, use the buses the trafo is connected to in PSCAD
+        lv_bus = man_input.get("trafo", name, "lv_bus")
+        if lv_bus is None:
+            lv_bus = get_port_bus(trafo, lv_port)
+        lv_bus = get_bus_index(lv_bus)
+
+        hv_bus = man_input.get("trafo", name, "hv_bus")
+        if hv_bus is None:
+            hv_bus = get_port_bus(trafo, hv_port)
+        hv_bus = get_bus_index(hv_bus)
+
         # add hour index to vector group and set shift degree
         # YNd1
         if vector_group == "YNd" and trafo.get_parameters()["Lead"] == "1":
@@ -284,92 +926,67 @@ def create_trafos_from_pscad():
         i0_percent = float(trafo.get_parameters()["Im1"].split("[")[0].replace(" ", ""))
 
         # use parameters from manual input sheet. If none are available, set default values
-
-        if not df.empty:
-            if not pd.isna(df.at[df[df["Name"] == name].index[0], "tap_step_percent"]):
-                tap_step_percent = df.at[df[df["Name"] == name].index[0], "tap_step_percent"]
-            else:
-                tap_step_percent = np.nan
-
-            if not pd.isna(df.at[df[df["Name"] == name].index[0], "tap_pos"]):
-                tap_pos = df.at[df[df["Name"] == name].index[0], "tap_pos"]
-            else:
-                tap_pos = np.nan
-
-            if not pd.isna(df.at[df[df["Name"] == name].index[0], "tap_neutral"]):
-                tap_neutral = df.at[df[df["Name"] == name].index[0], "tap_neutral"]
-            else:
-                tap_neutral = np.nan
-
-            if not pd.isna(df.at[df[df["Name"] == name].index[0], "tap_step_degree"]):
-                tap_step_degree = df.at[df[df["Name"] == name].index[0], "tap_step_degree"]
-            else:
-                tap_step_degree = np.nan
-        else:
-            tap_step_percent = np.nan
-            tap_pos = np.nan
-            tap_neutral = np.nan
-            tap_step_degree = np.nan
-
-        pp.create_transformer_from_parameters(net=net, hv_bus=hv_bus, lv_bus=lv_bus, sn_mva=sn_mva, vn_hv_kv=vn_hv_kv,
-                                              vn_lv_kv=vn_lv_kv, vkr_percent=vkr_percent, vk_percent=vk_percent,
-                                              pfe_kw=pfe_kw, i0_percent=i0_percent, name=name,
-                                              vector_group=vector_group, shift_degree=shift_degree, tap_side=tap_side,
-                                              tap_step_percent=tap_step_percent, tap_pos=tap_pos,
-                                              tap_neutral=tap_neutral, tap_step_degree=tap_step_degree)
-
-
-# creates load in pandapower with parameters from pscad
-def create_loads_from_pscad():
-    try:
-        df = pd.read_excel(directory + "\\" + "man_input.xlsx", sheet_name="load")
-    except FileNotFoundError:
-        df = pd.DataFrame()
-
-    for load in load_list:
-        name = int(load._id[0])
+        tap_step_percent = man_input.get("trafo", name, "tap_step_percent", np.nan)
+        tap_pos = man_input.get("trafo", name, "tap_pos", np.nan)
+        tap_neutral = man_input.get("trafo", name, "tap_neutral", np.nan)
+        tap_step_degree = man_input.get("trafo", name, "tap_step_degree", np.nan)
+
+        rows.append(dict(hv_buses=hv_bus, lv_buses=lv_bus, sn_mva=sn_mva, vn_hv_kv=vn_hv_kv, vn_lv_kv=vn_lv_kv,
+                         vkr_percent=vkr_percent, vk_percent=vk_percent, pfe_kw=pfe_kw, i0_percent=i0_percent,
+                         name=name, vector_group=vector_group, shift_degree=shift_degree, tap_side=tap_side,
+                         tap_step_percent=tap_step_percent, tap_pos=tap_pos, tap_neutral=tap_neutral,
+                         tap_step_degree=tap_step_degree))
+
+    if rows:
+        # vector groups get set afterwards, the bulk function can't take a list of strings for them
+        columns = to_columns(rows)
+        vector_groups = columns.pop("vector_group")
+        indices = pp.create_transformers_from_parameters(net=net, **columns)
+        net.trafo.loc[indices, "vector_group"] = vector_groups
+        element_index.update((tuple(trafo._id), ("trafo", index)) for trafo, index in zip(trafos, indices))
+
+
+# creates load in pandapower with parameters from pscad. Only the given loads are created if there are any
+def create_loads_from_pscad(loads=None):
+    if loads is None:
+        loads = load_list
+
+    rows = []
+    for load in loads:
+        name = page_name(getattr(load, "page", "Main"), int(load._id[0]))
         p_mw = float(load.get_parameters()["PO"].split("[")[0].replace(" ", "")) * 3
         q_mvar = float(load.get_parameters()["QO"].split("[")[0].replace(" ", "")) * 3
 
-        if not df.empty:
-            if not pd.isna(df.at[df[df["Name"] == name].index[0], "Bus"]):
-                bus = get_bus_index(df.at[df[df["Name"] == name].index[0], "Bus"])
-            else:
-                bus = get_bus_index(get_bus(load.get_port_location("IA")))
-        else:
-            bus = get_bus_index(get_bus(load.get_port_location("IA")))
+        bus = man_input.get("load", name, "Bus")
+        if bus is None:
+            bus = get_port_bus(load, "IA")
+        bus = get_bus_index(bus)
 
-        pp.create_load(net=net, bus=bus, p_mw=p_mw, q_mvar=q_mvar, name=name)
+        rows.append(dict(buses=bus, p_mw=p_mw, q_mvar=q_mvar, name=name))
 
+    if rows:
+        indices = pp.create_loads(net=net, **to_columns(rows))
+        element_index.update((tuple(load._id), ("load", index)) for load, index in zip(loads, indices))
 
-# creates generator in pandapower with parameters from pscad
-def create_gens_from_pscad():
-    try:
-        df = pd.read_excel(directory + "\\" + "man_input.xlsx", sheet_name="gen")
-    except FileNotFoundError:
-        df = pd.DataFrame()
 
-    for gen in gen_list:
+# creates generator in pandapower with parameters from pscad. Only the given sources are created if there are any
+def create_gens_from_pscad(gens=None):
+    if gens is None:
+        gens = gen_list
+
+    rows = []
+    ids = []
+    for gen in gens:
         # check if a name exists, if it does use it, otherwise use cmp id
         if gen.get_parameters()["Name"]:
             name = gen.get_parameters()["Name"]
         else:
             name = str(gen._id[0])
+        name = page_name(getattr(gen, "page", "Main"), name)
 
-        if not df.empty:
-            # get q limits from manual input sheet
-            if not pd.isna(df.at[df[df["Name"] == name].index[0], "max_q_mvar"]):
-                max_q_mvar = df.at[df[df["Name"] == name].index[0], "max_q_mvar"]
-            else:
-                max_q_mvar = np.nan
-
-            if not pd.isna(df.at[df[df["Name"] == name].index[0], "min_q_mvar"]):
-                min_q_mvar = df.at[df[df["Name"] == name].index[0], "min_q_mvar"]
-            else:
-                min_q_mvar = np.nan
-        else:
-            max_q_mvar = np.nan
-            min_q_mvar = np.nan
+        # get q limits from manual input sheet
+        max_q_mvar = man_input.get("gen", name, "max_q_mvar", np.nan)
+        min_q_mvar = man_input.get("gen", name, "min_q_mvar", np.nan)
 
         # check which PSCAD definition the current generator has
         if str(gen.get_definition()) == "master:source3":
@@ -382,13 +999,7 @@ def create_gens_from_pscad():
             # only used for slack bus
             va_degree = float(gen.get_parameters()["Ph"].split("[")[0].replace(" ", ""))
 
-            if not df.empty:
-                if not pd.isna(df.at[df[df["Name"] == name].index[0], "Bus"]):
-                    bus = get_bus_index(df.at[df[df["Name"] == name].index[0], "Bus"])
-                else:
-                    bus = get_bus_index(get_bus(gen.get_port_location("N3")))
-            else:
-                bus = get_bus_index(get_bus(gen.get_port_location("N3")))
+            port = "N3"
 
         elif str(gen.get_definition()) == "master:source_3":
             p_mw = float(gen.get_parameters()["Pinit"].split("[")[0].replace(" ", ""))
@@ -396,392 +1007,1269 @@ def create_gens_from_pscad():
             # only used for slack bus
             va_degree = float(gen.get_parameters()["PhT"].split("[")[0].replace(" ", ""))
 
-            if not df.empty:
-                if not pd.isna(df.at[df[df["Name"] == name].index[0], "Bus"]):
-                    bus = get_bus_index(df.at[df[df["Name"] == name].index[0], "Bus"])
-                else:
-                    bus = get_bus_index(get_bus(gen.get_port_location("N")))
-            else:
-                bus = get_bus_index(get_bus(gen.get_port_location("N")))
+            port = "N"
+
+        bus = man_input.get("gen", name, "Bus")
+        if bus is None:
+            bus = get_port_bus(gen, port)
+        bus = get_bus_index(bus)
 
         # check if gen is connected to slack bus
-        if bus == get_bus_index(slack_ent.get()):
+        if bus == get_bus_index(settings["slack_bus"]):
 
             # get short circuit parameters for external grid from manual input sheet. Use default values if there are none
-            pp.create_ext_grid(net=net, bus=bus, vm_pu=vm_pu, va_degree=va_degree, name=name, max_q_mvar=max_q_mvar,
-                               min_q_mvar=min_q_mvar)
+            element_index[tuple(gen._id)] = ("ext_grid", pp.create_ext_grid(net=net, bus=bus, vm_pu=vm_pu,
+                                                                     va_degree=va_degree, name=name,
+                                                                     max_q_mvar=max_q_mvar, min_q_mvar=min_q_mvar))
 
         else:
-            pp.create_gen(net=net, bus=bus, p_mw=p_mw, vm_pu=vm_pu, name=name, max_q_mvar=max_q_mvar,
-                          min_q_mvar=min_q_mvar)
+            rows.append(dict(buses=bus, p_mw=p_mw, vm_pu=vm_pu, name=name, max_q_mvar=max_q_mvar,
+                             min_q_mvar=min_q_mvar))
+            ids.append(tuple(gen._id))
+
+    if rows:
+        element_index.update((gen_id, ("gen", index)) for gen_id, index in zip(ids, pp.create_gens(net=net,
+                                                                                                  **to_columns(rows))))
+
+
+# index over the main.dta file of a project. The file is read once, afterwards the nodes of a branch and the bus of a
+# node can be looked up directly
+class DtaIndex:
+    def __init__(self, dtafile):
+        # branch name -> (node_1, node_2)
+        self.branch_nodes = {}
+        # node -> bus name, from the "Local Node Voltages" section
+        self.node_bus = {}
+        # all comment lines with the nodes following them, for names that are not the first word of their comment
+        self.comments = []
+
+        in_node_section = False
+        # the nodes of a branch are in the second and third line after its comment, so keep the last four lines
+        window = deque(maxlen=4)
+        with open(dtafile, "r") as fp:
+            for line in fp:
+                if line.find("! Local Node Voltages") != -1:
+                    in_node_section = True
+                elif line.find("! Local Branch Data") != -1:
+                    in_node_section = False
+
+                if in_node_section and line.find(r"//") != -1:
+                    self.node_bus[line.split("0.0")[0].replace(" ", "")] = line.split(r"//")[1].lstrip().split("(")[0]
+
+                window.append(line)
+                if len(window) == 4 and window[0].find(r"! ") != -1:
+                    self.add_branch(window[0], window[2], window[3])
+
+    # adds the nodes listed after a comment line
+    def add_branch(self, comment, line_1, line_2):
+        try:
+            nodes = (line_1.split(" ")[1], line_2.split(" ")[1])
+        except IndexError:
+            return
+
+        self.comments.append((comment, nodes))
+        words = comment[comment.find(r"! ") + 2:].split()
+        if words:
+            self.branch_nodes[words[0]] = nodes
+
+    # returns the nodes of a branch. Falls back to searching all comments for the name like PSCAD did before
+    def get_branch_nodes(self, name):
+        if name in self.branch_nodes:
+            return self.branch_nodes[name]
+
+        for comment, nodes in reversed(self.comments):
+            if comment.find(r"! " + name) != -1:
+                return nodes
+
+        raise KeyError(name)
+
+    # returns the pandapower bus indices of a branch as (to_bus, from_bus). The bus names of a module .dta file are
+    # qualified with the page of the branch
+    def get_branch_buses(self, name, page="Main"):
+        node_1, node_2 = self.get_branch_nodes(name)
+        return (get_bus_index(page_name(page, self.node_bus[node_1])),
+                get_bus_index(page_name(page, self.node_bus[node_2])))
+
+
+# line constants from a PSCAD .out file. source is "rxb" if the load flow rxb data exists, then the per unit values
+# and their base values u_n [V] and s_n [VA] are used. Otherwise source is "matrix" and the values per meter from the
+# impedance/admittance matrices are used
+LineConstants = namedtuple("LineConstants", ["source", "freq", "u_n", "s_n", "r_pu", "x_pu", "b_pu", "r_ohm_per_m",
+                                             "x_ohm_per_m", "b_mho_per_m"])
+
+
+# reads a PSCAD .out file of a TLine or Cable line by line and yields (key, value) pairs of the values needed for
+# pandapower. Values that are a few lines below their header get scheduled when the header is found, so no line has to
+# be looked up again
+def iter_out_file(fp):
+    scheduled = {}
+    for i, line in enumerate(fp):
+        for key, parse in scheduled.pop(i, []):
+            # a value in a line with another layout is skipped. Only the values of one source are needed, the matrix
+            # lines of a file with rxb data may not fit
+            try:
+                value = parse(line)
+            except (ValueError, IndexError):
+                continue
+            yield key, value
+
+        # rxb values exist, assign values for base of per unit quantities
+        if line.find("LOAD FLOW RXB FORMATTED DATA") != -1:
+            yield "freq", float(line.replace(" ", "").replace("LOADFLOWRXBFORMATTEDDATA@", "").replace("Hz:", ""))
+            scheduled.setdefault(i + 3, []).extend([
+                ("u_n", lambda l: float(l.replace(" ", "").split(",")[0].replace("BaseofPer-UnitQuantities:", "")
+                                        .replace("kV(L-L)", "")) * 1E3),
+                ("s_n", lambda l: float(l.replace(" ", "").split(",")[1].replace("MVA", "")) * 1E6)])
+
+        # frequency if there is no rxb data
+        elif line.find(r"SEQUENCE COMPONENT DATA @") != -1:
+            yield "sequence_freq", float(line.replace(" ", "").split(r"@")[1].replace("Hz:", ""))
+
+        # positive sequence data in per unit
+        elif line.strip() == "Positive Sequence":
+            scheduled.setdefault(i + 3, []).append(
+                ("r_pu", lambda l: float(l.replace(" ", "").replace(r"ResistanceRsq[pu]:", ""))))
+            scheduled.setdefault(i + 4, []).append(
+                ("x_pu", lambda l: float(l.replace(" ", "").replace(r"ReactanceXsq[pu]:", ""))))
+            scheduled.setdefault(i + 5, []).append(
+                ("b_pu", lambda l: float(l.replace(" ", "").replace(r"SusceptanceBsq[pu]:", ""))))
+
+        # pi component data from matrix form. The matrices come in the format "a,b" with a being the real part and b the
+        # imaginary part, the first entry is used
+        elif line.strip() == r"SERIES IMPEDANCE MATRIX (Z) [ohms/m]:":
+            scheduled.setdefault(i + 1, []).extend([
+                ("r_ohm_per_m", lambda l: float(l.lstrip().split("   ")[0].split(",")[0])),
+                ("x_ohm_per_m", lambda l: float(l.lstrip().split("   ")[0].split(",")[1]))])
+
+        elif line.strip() == r"SHUNT ADMITTANCE MATRIX (Y) [mhos/m]:":
+            scheduled.setdefault(i + 1, []).append(
+                ("b_mho_per_m", lambda l: float(l.lstrip().split("   ")[0].split(",")[1])))
+
+
+# reads the line constants of a TLine or Cable from its .out file. The first value found for each key is used and
+# reading stops as soon as all rxb values are found
+def read_line_constants(outfile):
+    rxb_keys = ("freq", "u_n", "s_n", "r_pu", "x_pu", "b_pu")
+    values = {}
+    with open(outfile, "r") as fp:
+        for key, value in iter_out_file(fp):
+            values.setdefault(key, value)
+            if all(key in values for key in rxb_keys):
+                break
+
+    if all(key in values for key in rxb_keys):
+        source = "rxb"
+    elif all(key in values for key in ("sequence_freq", "r_ohm_per_m", "x_ohm_per_m", "b_mho_per_m")):
+        source = "matrix"
+        values["freq"] = values["sequence_freq"]
+    else:
+        raise ValueError("No line constants found in " + outfile)
+
+    return LineConstants(source=source, **{field: values.get(field) for field in LineConstants._fields[1:]})
+
+
+# calculates absolute values in a format for pandapower from line constants
+def line_parameters(constants, length_km):
+    w = 2 * np.pi * constants.freq
+    if constants.source == "rxb":
+        r_ohm_per_km = constants.r_pu * (constants.u_n ** 2) / constants.s_n / length_km
+        x_ohm_per_km = constants.x_pu * (constants.u_n ** 2) / constants.s_n / length_km
+        c_nf_per_km = constants.b_pu * constants.s_n / (constants.u_n ** 2) / length_km / w * 1E9
+    else:
+        r_ohm_per_km = constants.r_ohm_per_m * 1E3
+        x_ohm_per_km = constants.x_ohm_per_m * 1E3
+        c_nf_per_km = constants.b_mho_per_m / w * 1E3 * 1E9
+
+    return r_ohm_per_km, x_ohm_per_km, c_nf_per_km
+
+
+# reads the line constants of all given .out files and returns them by file name. With more than one worker the files
+# get parsed concurrently in a thread pool, or in a process pool if processes is set
+def extract_line_constants(outfiles, workers=1, processes=False):
+    if workers <= 1 or len(outfiles) <= 1:
+        return {outfile: read_line_constants(outfile) for outfile in outfiles}
+
+    executor = ProcessPoolExecutor if processes else ThreadPoolExecutor
+    with executor(max_workers=workers) as pool:
+        chunksize = max(1, len(outfiles) // (workers * 4))
+        return dict(zip(outfiles, pool.map(read_line_constants, outfiles, chunksize=chunksize)))
+
+
+# returns the sha1 hash of a files content
+def file_hash(filename):
+    with open(filename, "rb") as fp:
+        return hashlib.sha1(fp.read()).hexdigest()
+
+
+# reads the line constants of all given .out files like extract_line_constants, but keeps them in a cache file next to
+# the project. A cached entry is used if mtime and size of its .out file are unchanged, or if they changed but the
+# content hash didn't. Only the remaining files get parsed. Entries of files that aren't requested anymore are removed
+def cached_extract_line_constants(outfiles, cachefile, workers=1):
+    global line_constants_cache_stats
+    try:
+        with open(cachefile, "r") as fp:
+            cache = json.load(fp)
+    except (FileNotFoundError, ValueError):
+        cache = {}
+
+    constants = {}
+    stamps = {}
+    misses = []
+    for outfile in outfiles:
+        stat = os.stat(outfile)
+        stamps[outfile] = {"mtime": stat.st_mtime_ns, "size": stat.st_size}
+        entry = cache.get(outfile)
+
+        if entry and entry["mtime"] == stat.st_mtime_ns and entry["size"] == stat.st_size:
+            constants[outfile] = LineConstants(**entry["constants"])
+            continue
+
+        stamps[outfile]["hash"] = file_hash(outfile)
+        if entry and entry["hash"] == stamps[outfile]["hash"]:
+            constants[outfile] = LineConstants(**entry["constants"])
+        else:
+            misses.append(outfile)
+
+    constants.update(extract_line_constants(misses, workers=workers))
+
+    # rebuild cache with the current files only, so deleted lines get evicted
+    new_cache = {}
+    for outfile in outfiles:
+        new_cache[outfile] = dict(cache.get(outfile, {}), **stamps[outfile])
+        new_cache[outfile]["constants"] = constants[outfile]._asdict()
+
+    if new_cache != cache:
+        with open(cachefile, "w") as fp:
+            json.dump(new_cache, fp)
+
+    line_constants_cache_stats = {"hits": len(outfiles) - len(misses), "misses": len(misses)}
+    print("Line constants cache: %d hits, %d misses" % (line_constants_cache_stats["hits"], len(misses)))
+    return constants
+
+
+# returns the folder with the .dta and .out files of the project for the selected compiler
+def project_folder():
+    if settings["fortran_version"] == "GFortran 4.2.1":
+        return os.path.join(directory, project_name + ".gf42")
+    elif settings["fortran_version"] == "GFortran 4.6.2":
+        return os.path.join(directory, project_name + ".gf46")
+
+
+# returns the .dta file with the nodes of a line or cable: main.dta on the main canvas, otherwise the file of its module
+def dta_name(branch):
+    canvas_name = getattr(branch, "canvas_name", "Main")
+    return "main.dta" if canvas_name == "Main" else canvas_name + ".dta"
 
 
 # creates transmission lines in PandaPower with parameters from pscad; type ol = overhead line, cs = underground cable system
 def create_lines_from_pscad():
     # setup directory for needed documents
-    if fortran_version == "GFortran 4.2.1":
-        folder = directory + "\\" + project_name + ".gf42"
-    elif fortran_version == "GFortran 4.6.2":
-        folder = directory + "\\" + project_name + ".gf46"
+    folder = project_folder()
 
-    try:
-        df = pd.read_excel(directory + "\\" + "man_input.xlsx", sheet_name="line")
-    except FileNotFoundError:
-        df = pd.DataFrame()
-
-    # get .dta file name
-    dtafile = folder + "\\" + "main.dta"
-
-    # defines area with lower and upper limits for node-bus allocation
-    with open(folder + "\\" + "main.dta", "r") as fp:
-        lines = fp.readlines()
-        for line in lines:
-            if line.find("! Local Node Voltages") != -1:
-                lower_limit = lines.index(line)
-            if line.find("! Local Branch Data") != -1:
-                upper_limit = lines.index(line)
-
-    # create lines in PandaPower with parameters from PSCAD
-    for tline in tline_list:
-        name = tline.get_parameters()["Name"]
-        length_km = float(tline.get_parameters()["Length"].split("[")[0].replace(" ", ""))
-        type = "ol"
-
-        # get .out file name
-        outfile = folder + "\\" + name + ".out"
-
-        # read nodes from main.dta file
-        with open(folder + "\\" + "main.dta", "r") as fp:
-            lines = fp.readlines()
-            for line in lines:
-                if line.find(r"! " + name) != -1:
-                    node_1 = lines[lines.index(line) + 2].split(" ")[1]
-                    node_2 = lines[lines.index(line) + 3].split(" ")[1]
-
-        # lookup nodes for buses
-        with open(folder + "\\" + "main.dta", "r") as fp:
-            lines = fp.readlines()
-            for line in lines[lower_limit:upper_limit]:
-                if line.split("0.0")[0].replace(" ", "") == node_1:
-                    to_bus = get_bus_index(line.split(r"//")[1].lstrip().split("(")[0])
-
-                if line.split("0.0")[0].replace(" ", "") == node_2:
-                    from_bus = get_bus_index(line.split(r"//")[1].lstrip().split("(")[0])
-
-        with open(outfile, "r") as fp:
-            # If load_flow_data_exists is true, load flow data exists in rxb form and can be used. Otherwise it needs
-            # to be extracted from the admittance/impedance matrices
-            load_flow_data_exists = False
-            lines = fp.readlines()
-
-            # check if rxb values exist
-            # assign values for base of per unit quantities
-            for line in lines:
-                if line.find("LOAD FLOW RXB FORMATTED DATA") != -1:
-                    load_flow_data_exists = True
-                    freq = float(line.replace(" ", "").replace("LOADFLOWRXBFORMATTEDDATA@", "").replace("Hz:", ""))
-                    w = 2 * np.pi * freq
-                    U_n = float(
-                        lines[lines.index(line) + 3].replace(" ", "").split(",")[0].replace("BaseofPer-UnitQuantities:",
-                                                                                            "").replace("kV(L-L)",
-                                                                                                        "")) * 1E3
-                    S_n = float(lines[lines.index(line) + 3].replace(" ", "").split(",")[1].replace("MVA", "")) * 1E6
-
-            # read  output file from pscad to get zero and positive sequence values
-        with open(outfile, "r") as fp:
-
-            # search for zero/positive sequences in tline output files
-            lines = fp.readlines()
-            for line in lines:
-
-                # find positive sequence data if rxb values exist and calculate absolute values in a format for pandapower from per unit values
-                if line.strip() == "Positive Sequence" and load_flow_data_exists:
-                    R_pu = float(lines[lines.index(line) + 3].replace(" ", "").replace(r"ResistanceRsq[pu]:", ""))
-                    X_pu = float(lines[lines.index(line) + 4].replace(" ", "").replace(r"ReactanceXsq[pu]:", ""))
-                    B_pu = float(lines[lines.index(line) + 5].replace(" ", "").replace(r"SusceptanceBsq[pu]:", ""))
-
-                    r_ohm_per_km = R_pu * (U_n ** 2) / S_n / length_km
-                    x_ohm_per_km = X_pu * (U_n ** 2) / S_n / length_km
-                    c_nf_per_km = B_pu * S_n / (U_n ** 2) / length_km / w * 1E9
-
-                # find pi component data from matrix form if rxb values do not exist
-                # the admittance/impedance matrices come in the format "a,b" with a being the real part and b the imaginary part
-                # split them up after the comma to assign the proper values for each parameter
-                if line.strip() == r"SERIES IMPEDANCE MATRIX (Z) [ohms/m]:" and not load_flow_data_exists:
-                    r_ohm_per_km = float(lines[lines.index(line) + 1].replace(" ", "").split(",")[0]) * 1E3
-                    x_ohm_per_km = float(lines[lines.index(line) + 1].replace(" ", "").split(",")[1]) * 1E3
-                    c_nf_per_km = float(lines[lines.index(line) + 4].replace(" ", "").split(",")[1]) / w * 1E3 * 1E9
+    # read each .dta file once for node-bus allocation of all lines and cables
+    dta = {}
 
-        # read values for max_i_ka from manual input spreadsheet. If no value exist, set a default value
-        if not df.empty:
-            if not pd.isna(df.at[df[df["Name"] == name].index[0], "max_i_ka"]):
-                max_i_ka = df.at[df[df["Name"] == name].index[0], "max_i_ka"]
-            else:
-                max_i_ka = 1E9
-        else:
-            max_i_ka = 1E9
+    # type ol = overhead line, cs = underground cable system
+    branches = [(tline, "ol") for tline in tline_list] + [(cable, "cs") for cable in cable_list]
+    names = [branch.get_parameters()["Name"] for branch, type in branches]
 
-        # create tline in pandapower
-        pp.create_line_from_parameters(net=net, from_bus=from_bus, to_bus=to_bus, length_km=length_km,
-                                       type=type, r_ohm_per_km=r_ohm_per_km, x_ohm_per_km=x_ohm_per_km,
-                                       c_nf_per_km=c_nf_per_km, max_i_ka=max_i_ka, name=name)
+    # parse the .out files of all lines and cables first, this is where most of the time is spent
+    constants = cached_extract_line_constants([os.path.join(folder, name + ".out") for name in names],
+                                              os.path.join(directory, project_name + "_line_constants.json"),
+                                              workers=settings["parser_workers"])
 
-    # create cables in PandaPower with parameters from PSCAD
-    for cable in cable_list:
-        # get definition name
-        name = cable.get_parameters()["Name"]
+    # create lines and cables in PandaPower with parameters from PSCAD
+    rows = []
+    for (branch, type), name in zip(branches, names):
+        length_km = float(branch.get_parameters()["Length"].split("[")[0].replace(" ", ""))
 
-        # get .out file name
-        outfile = folder + "\\" + name + ".out"
+        # lookup buses for the nodes from the .dta file of the canvas
+        if dta_name(branch) not in dta:
+            dta[dta_name(branch)] = DtaIndex(os.path.join(folder, dta_name(branch)))
+        to_bus, from_bus = dta[dta_name(branch)].get_branch_buses(name, getattr(branch, "page", "Main"))
 
-        # assign default values
-        type = "cs"
-        length_km = float(cable.get_parameters()["Length"].split("[")[0].replace(" ", ""))
+        # calculate parameters from line constants in output file of pscad
+        r_ohm_per_km, x_ohm_per_km, c_nf_per_km = line_parameters(constants[os.path.join(folder, name + ".out")],
+                                                                  length_km)
 
-        # read nodes from main.dta file
-        with open(dtafile, "r") as fp:
-            lines = fp.readlines()
-            for line in lines:
-                if line.find(r"! " + name) != -1:
-                    node_1 = lines[lines.index(line) + 2].split(" ")[1]
-                    node_2 = lines[lines.index(line) + 3].split(" ")[1]
-
-        # lookup nodes for buses in pre defined area
-        with open(folder + "\\" + "main.dta", "r") as fp:
-            lines = fp.readlines()
-
-            for line in lines[lower_limit:upper_limit]:
-                if line.split("0.0")[0].replace(" ", "") == node_1:
-                    to_bus = get_bus_index(line.split(r"//")[1].lstrip().split("(")[0])
-
-                if line.split("0.0")[0].replace(" ", "") == node_2:
-                    from_bus = get_bus_index(line.split(r"//")[1].lstrip().split("(")[0])
-
-        with open(outfile, "r") as fp:
-            # If load_flow_data_exists is true, load flow data exists in rxb form and can be used. Otherwise it needs to be extracted from
-            # the admittance/impedance matrices
-            load_flow_data_exists = False
-            lines = fp.readlines()
-
-            # check if rxb values exist
-            # assign values for base of per unit quantities
-            for line in lines:
-                if line.find("LOAD FLOW RXB FORMATTED DATA") != -1:
-                    load_flow_data_exists = True
-                    freq = float(line.replace(" ", "").replace("LOADFLOWRXBFORMATTEDDATA@", "").replace("Hz:", ""))
-                    w = 2 * np.pi * freq
-                    U_n = float(
-                        lines[lines.index(line) + 3].replace(" ", "").split(",")[0].replace("BaseofPer-UnitQuantities:",
-                                                                                            "").replace("kV(L-L)",
-                                                                                                        "")) * 1E3
-                    S_n = float(lines[lines.index(line) + 3].replace(" ", "").split(",")[1].replace("MVA", "")) * 1E6
-
-                elif line.find(r"SEQUENCE COMPONENT DATA @") != -1 and not load_flow_data_exists:
-                    freq = float(line.replace(" ", "").split(r"@")[1].replace("Hz:", ""))
-                    w = 2 * np.pi * freq
-
-        # read  output file from pscad to get positive sequence values
-        with open(outfile, "r") as fp:
-
-            # search for positive sequences in cable output files
-            lines = fp.readlines()
-            for line in lines:
-
-                # find positive sequence data if rxb values exist and calculate absolute values in a format for pandapower from per unit values
-                if line.strip() == "Positive Sequence" and load_flow_data_exists:
-                    R_pu = float(lines[lines.index(line) + 3].replace(" ", "").replace(r"ResistanceRsq[pu]:", ""))
-                    X_pu = float(lines[lines.index(line) + 4].replace(" ", "").replace(r"ReactanceXsq[pu]:", ""))
-                    B_pu = float(lines[lines.index(line) + 5].replace(" ", "").replace(r"SusceptanceBsq[pu]:", ""))
-
-                    r_ohm_per_km = R_pu * (U_n ** 2) / S_n / length_km
-                    x_ohm_per_km = X_pu * (U_n ** 2) / S_n / length_km
-                    c_nf_per_km = B_pu * S_n / (U_n ** 2) / length_km / w * 1E9
-
-                # find pi component data from matrix form if rxb values do not exist
-                # the admittance/impedance matrices come in the format "a,b" with a being the real part and b the imaginary part
-                # split them up after the comma to assign the proper values for each parameter
-                if line.strip() == r"SERIES IMPEDANCE MATRIX (Z) [ohms/m]:" and not load_flow_data_exists:
-                    r_ohm_per_km = float(lines[lines.index(line) + 1].lstrip().split("   ")[0].split(",")[0]) * 1E3
-                    x_ohm_per_km = float(lines[lines.index(line) + 1].lstrip().split("   ")[0].split(",")[1]) * 1E3
-
-                if line.strip() == r"SHUNT ADMITTANCE MATRIX (Y) [mhos/m]:" and not load_flow_data_exists:
-                    c_nf_per_km = float(
-                        lines[lines.index(line) + 1].lstrip().split("   ")[0].split(",")[1]) / w * 1E3 * 1E9
-
-        # if there are values for certain parameters, use those. If there are none, use the parameters from pscad
-        if not df.empty:
-            if not pd.isna(df.at[df[df["Name"] == name].index[0], "max_i_ka"]):
-                max_i_ka = df.at[df[df["Name"] == name].index[0], "max_i_ka"]
-            else:
-                max_i_ka = 1E9
-        else:
-            max_i_ka = 1E9
+        # read values for max_i_ka from manual input spreadsheet. If no value exist, set a default value
+        name = page_name(getattr(branch, "page", "Main"), name)
+        max_i_ka = man_input.get("line", name, "max_i_ka", 1E9)
 
-        # create cable in pandapower
-        pp.create_line_from_parameters(net=net, from_bus=from_bus, to_bus=to_bus, length_km=length_km, type=type,
-                                       r_ohm_per_km=r_ohm_per_km, x_ohm_per_km=x_ohm_per_km, c_nf_per_km=c_nf_per_km,
-                                       max_i_ka=max_i_ka, name=name)
+        rows.append(dict(from_buses=from_bus, to_buses=to_bus, length_km=length_km, type=type,
+                         r_ohm_per_km=r_ohm_per_km, x_ohm_per_km=x_ohm_per_km, c_nf_per_km=c_nf_per_km,
+                         max_i_ka=max_i_ka, name=name))
 
+    if rows:
+        indices = pp.create_lines_from_parameters(net=net, **to_columns(rows))
+        element_index.update((tuple(branch._id), ("line", index)) for (branch, type), index in zip(branches, indices))
 
-# creates capacity banks in PandaPower with parameters from PSCAD
-def create_cap_banks_from_pscad():
-    try:
-        df = pd.read_excel(directory + "\\" + "man_input.xlsx", sheet_name="cap_bank")
-    except FileNotFoundError:
-        df = pd.DataFrame()
 
-    for cap in cap_list:
-        name = int(cap._id[0])
+# creates capacity banks in PandaPower with parameters from PSCAD. Only the given cap banks are created if there are any
+def create_cap_banks_from_pscad(caps=None):
+    if caps is None:
+        caps = cap_list
 
-        if not df.empty:
-            if not pd.isna(df.at[df[df["Name"] == name].index[0], "Bus"]):
-                bus = get_bus_index(df.at[df[df["Name"] == name].index[0], "Bus"])
-            else:
-                try:
-                    bus = get_bus_index(get_bus(cap.get_port_location("A")))
-                except KeyError:
-                    bus = get_bus_index(get_bus(cap.get_port_location("B")))
-        else:
-            try:
-                bus = get_bus_index(get_bus(cap.get_port_location("A")))
-            except KeyError:
-                bus = get_bus_index(get_bus(cap.get_port_location("B")))
+    rows = []
+    for cap in caps:
+        name = page_name(getattr(cap, "page", "Main"), int(cap._id[0]))
+
+        bus = man_input.get("cap_bank", name, "Bus")
+        if bus is None:
+            bus = get_port_bus(cap, "A", "B")
+        bus = get_bus_index(bus)
 
         # get base voltage for reactive power calculation from connected bus
         vn_kv = net.bus["vn_kv"][bus]
         # calculate reactive power from capacity. q = wcu^2
         c = float(cap.get_parameters()["C"].split("[")[0].replace(" ", "")) * 1E-6
-        w = 2 * np.pi * float(freq_ent.get())
+        w = 2 * np.pi * settings["freq"]
         q_mvar = w * c * ((vn_kv * 1E3) ** 2) / 1E6
 
-        pp.create_shunt_as_capacitor(net=net, bus=bus, q_mvar=q_mvar, vn_kv=vn_kv, loss_factor=0, name=name)
+        # capacitor as shunt without losses, like pp.create_shunt_as_capacitor
+        rows.append(dict(buses=bus, q_mvar=-q_mvar, p_mw=0.0, vn_kv=vn_kv, name=name))
 
+    if rows:
+        indices = pp.create_shunts(net=net, **to_columns(rows))
+        element_index.update((tuple(cap._id), ("shunt", index)) for cap, index in zip(caps, indices))
 
-# updates generators in PSCAD with results from PandaPower load flow analysis
-def update_gens_in_pscad():
-    for gen in gen_list:
-        # use PSCAD name, if none exist use the PSCAD id
-        if gen.get_parameters()["Name"]:
-            name = gen.get_parameters()["Name"]
-        else:
-            name = int(gen._id[0])
 
-        # get PandaPower results for current gen, depending on whether it's represented as a generator or external grid in PandaPower
-        try:
-            this_gen_pp_index = pp.get_element_index(net=net, element="gen", name=name)
-            pinit_mw = float(net.res_gen["p_mw"][this_gen_pp_index])
-            qinit_mvar = float(net.res_gen["q_mvar"][this_gen_pp_index])
-            v_pu = float(net.res_gen["vm_pu"][this_gen_pp_index])
-            ph = float(net.res_gen["va_degree"][this_gen_pp_index])
-
-        except UserWarning:
-            this_ext_grid_index = pp.get_element_index(net=net, element="ext_grid", name=name)
+# parameters of the PSCAD sources that get the powerflow results, in the order p, q, voltage angle and voltage
+writeback_parameters = {"master:source3": ("Pinit", "Qinit", "Ph", "Es"),
+                        "master:source_3": ("Pinit", "Qinit", "PhT", "Vpu")}
 
-            pinit_mw = float(net.res_ext_grid["p_mw"][this_ext_grid_index])
-            qinit_mvar = float(net.res_ext_grid["q_mvar"][this_ext_grid_index])
-            v_pu = float(net.ext_grid["vm_pu"][this_ext_grid_index])
-            ph = float(net.ext_grid["va_degree"][this_ext_grid_index])
-
-        if str(gen.get_definition()) == "master:source3":
-            u_n_kv = float(gen.get_parameters()["Vm"].split("[")[0].replace(" ", ""))
-            s_n_mva = float(gen.get_parameters()["MVA"].split("[")[0].replace(" ", ""))
 
-            pinit_pu = pinit_mw / s_n_mva
-            qinit_pu = qinit_mvar / s_n_mva
-            es_kv = v_pu * u_n_kv
+# reads a numeric PSCAD parameter, NaN if it's missing or not a number
+def parameter_value(parameters, key):
+    try:
+        return float(parameters[key].split("[")[0].replace(" ", ""))
+    except (KeyError, AttributeError, ValueError):
+        return np.nan
+
+
+# updates generators in PSCAD with results from PandaPower load flow analysis. The results of all sources are looked up
+# at once through the element index, only parameters that changed by more than the tolerance are written and each
+# source gets at most one call
+def update_gens_in_pscad(tolerance=1E-6):
+    if not gen_list:
+        return
+
+    definitions = np.array([gen.get_definition() for gen in gen_list])
+    parameters = [gen.get_parameters() for gen in gen_list]
+    elements = np.array([element_index[tuple(gen._id)][0] for gen in gen_list])
+    indices = np.array([element_index[tuple(gen._id)][1] for gen in gen_list])
+
+    # p, q, voltage and angle of every source, from the generator results or the external grid setpoints
+    results = np.full((len(gen_list), 4), np.nan)
+    is_gen = elements == "gen"
+    results[is_gen] = net.res_gen.loc[indices[is_gen], ["p_mw", "q_mvar", "vm_pu", "va_degree"]].values
+    results[~is_gen, :2] = net.res_ext_grid.loc[indices[~is_gen], ["p_mw", "q_mvar"]].values
+    results[~is_gen, 2:] = net.ext_grid.loc[indices[~is_gen], ["vm_pu", "va_degree"]].values
+
+    # source3 has its base values in MVA and Vm, source_3 in Sbase and its voltage in per unit
+    is_source3 = definitions == "master:source3"
+    s_n_mva = np.array([parameter_value(parameters[i], "MVA" if is_source3[i] else "Sbase")
+                        for i in range(len(gen_list))])
+    u_n_kv = np.array([parameter_value(parameters[i], "Vm") if is_source3[i] else 1.0 for i in range(len(gen_list))])
+
+    new_values = np.column_stack([results[:, 0] / s_n_mva, results[:, 1] / s_n_mva, results[:, 3],
+                                  results[:, 2] * u_n_kv])
+    old_values = np.array([[parameter_value(parameters[i], key) for key in writeback_parameters[definitions[i]]]
+                           for i in range(len(gen_list))])
+    # values that can't be calculated, like for sources without base values, are left as they are
+    changed = ~(np.abs(new_values - old_values) <= tolerance) & np.isfinite(new_values)
+
+    # sources in a module with several instances are one component in PSCAD, it can't take the results of every
+    # instance
+    instances = {}
+    for gen in gen_list:
+        instances[canvas_id(gen)] = instances.get(canvas_id(gen), 0) + 1
+    shared = np.array([instances[canvas_id(gen)] > 1 for gen in gen_list])
+    changed[shared] = False
+    if shared.any():
+        print("Warning: %d sources are in modules with several instances, their results aren't written back"
+              % shared.sum())
+
+    updated = 0
+    for i in np.flatnonzero(changed.any(axis=1)):
+        keys = writeback_parameters[definitions[i]]
+        gen_list[i].set_parameters(**{keys[j]: float(new_values[i, j]) for j in np.flatnonzero(changed[i])})
+        updated += 1
+
+    run_report["writeback"] = {"sources": len(gen_list), "updated": updated, "parameters": int(changed.sum()),
+                               "shared": int(shared.sum())}
+    print("Gen writeback: %d of %d sources changed, %d parameters" % (updated, len(gen_list), changed.sum()))
+
+
+# runs the program from the command line. "headless" builds and solves a project from a canvas snapshot and "batch" runs
+# several projects. The benchmarks and checks are run through benchmarks.py
+def run_command_line(args):
+    parser = argparse.ArgumentParser(prog="PSCAD Loadflow initializer")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    defaults = default_settings()
+    headless = commands.add_parser("headless", help="build and solve a project from a canvas snapshot without PSCAD")
+    headless.add_argument("snapshot", help="canvas snapshot file created with the gui")
+    headless.add_argument("--freq", type=float, default=defaults["freq"], help="frequency for powerflow calculation")
+    headless.add_argument("--slack", default=defaults["slack_bus"], help="PSCAD bus name of the slack bus")
+    headless.add_argument("--iterations", default=defaults["max_iteration"], help="maximal iterations or auto")
+    headless.add_argument("--init", default=defaults["init"], help="initialisation of the powerflow calculation")
+    headless.add_argument("--q-limits", action="store_true", help="consider Q limits of generators")
+    headless.add_argument("--algorithm", choices=pf_algorithms, default=defaults["algorithm"],
+                          help="powerflow algorithm of pandapower")
+    headless.add_argument("--no-numba", action="store_true", help="don't use numba even if it is installed")
+    headless.add_argument("--lightsim2grid", action="store_true", help="use lightsim2grid if it is installed")
+    headless.add_argument("--validate-backend", action="store_true",
+                          help="compare the results with the default solver of pandapower")
+    headless.add_argument("--no-similar-bus-indices", action="store_true",
+                          help="don't use the indices from the PSCAD bus names")
+    headless.add_argument("--no-excel", action="store_true", help="don't export the PandaPower data")
+    headless.add_argument("--export-format", choices=export_formats, default=defaults["export_format"],
+                          help="format of the exported PandaPower data")
+    headless.add_argument("--fortran-version", help="compiler of the .dta and .out files, default from snapshot")
+    headless.add_argument("--parser-workers", type=int, default=defaults["parser_workers"],
+                          help="workers that read the TLine and Cable output files")
+    headless.add_argument("--full-rebuild", action="store_true",
+                          help="build the network graph even if the topology cache matches the canvas")
+    headless.add_argument("--incremental", action="store_true",
+                          help="update the network of the previous run instead of building it, only pays off if "
+                               "loading the saved network is faster than building it")
+    headless.add_argument("--contingency", action="store_true", help="run an N-1 contingency sweep")
+    headless.add_argument("--contingency-workers", type=int, default=defaults["contingency_workers"],
+                          help="worker processes of the N-1 contingency sweep")
+    headless.add_argument("--contingency-timeout", type=float, default=defaults["contingency_timeout"],
+                          help="seconds after which an N-1 case gets stopped")
+    headless.add_argument("--trace-memory", action="store_true",
+                          help="record the peak memory of every stage in the run report, slows down the run")
+
+    batch = commands.add_parser("batch", help="run several projects without the gui")
+    batch.add_argument("batch_file", help="json file with the projects and their settings")
+    batch.add_argument("--workers", type=int, default=os.cpu_count(), help="projects that run at the same time")
+    batch.add_argument("--summary", default="batch_summary.json", help="file for the summary of all projects")
+    args = parser.parse_args(args)
+
+    if args.command == "headless":
+        run_settings = dict(defaults, freq=args.freq, slack_bus=args.slack, init=args.init,
+                            enforce_q_lims=args.q_limits, algorithm=args.algorithm, numba=not args.no_numba,
+                            lightsim2grid=args.lightsim2grid, validate_backend=args.validate_backend,
+                            similar_bus_indices=not args.no_similar_bus_indices,
+                            excel=not args.no_excel, export_format=args.export_format, fortran_version=args.fortran_version,
+                            parser_workers=args.parser_workers, contingency=args.contingency,
+                            contingency_workers=args.contingency_workers,
+                            contingency_timeout=args.contingency_timeout, topology_cache=not args.full_rebuild,
+                            incremental=args.incremental, trace_memory=args.trace_memory)
+        run_settings["max_iteration"] = int(args.iterations) if args.iterations.isdigit() else args.iterations
+        run_headless(args.snapshot, run_settings)
+    elif args.command == "batch":
+        run_batch(args.batch_file, args.workers, args.summary)
+
+
+# PSCAD session that is kept for the life of the gui. PSCAD is launched on first use and loaded projects are kept, so
+# repeated runs reuse both. Before each use the session is checked, if PSCAD doesn't respond anymore it gets launched
+# again and if a project was closed it gets loaded again
+class PscadSession:
+    def __init__(self):
+        self.pscad = None
+        # project path -> project of the loaded projects
+        self.projects = {}
+        self.launches = 0
+        self.loads = 0
+
+    # returns the names of the projects loaded in PSCAD, or None if PSCAD doesn't respond
+    def loaded_projects(self):
+        try:
+            return {project["name"] for project in self.pscad.list_projects()}
+        except Exception:
+            return None
+
+    # returns the launched PSCAD application, launches it if there is none or if it doesn't respond anymore
+    def application(self):
+        if self.pscad is not None and self.loaded_projects() is None:
+            print("PSCAD doesn't respond, launching it again")
+            self.pscad = None
+
+        if self.pscad is None:
+            # silence: surpress dialogues, certificate: False = Legacy Licensing
+            self.pscad = mhrc_automation.launch_pscad(silence=True, minimize=True)
+            self.projects = {}
+            self.launches += 1
+
+        return self.pscad
+
+    # returns a project of the session, loads it if it isn't loaded yet
+    def project(self, project_path):
+        pscad = self.application()
+        name = os.path.splitext(os.path.basename(project_path))[0]
+        loaded = self.loaded_projects()
+        if loaded is None:
+            # PSCAD stopped responding after it was checked, launch it again. The new PSCAD has no projects loaded
+            pscad = self.application()
+            loaded = set()
+
+        if project_path not in self.projects or name not in loaded:
+            pscad.load(project_path)
+            self.projects[project_path] = pscad.project(name)
+            self.loads += 1
+
+        return self.projects[project_path]
+
+    # quits PSCAD if it was launched
+    def close(self):
+        if self.pscad is not None:
+            try:
+                self.pscad.quit()
+            except Exception:
+                pass
+        self.pscad = None
+        self.projects = {}
 
-            gen.set_parameters(Pinit=pinit_pu, Qinit=qinit_pu, Ph=ph, Es=es_kv)
 
-        elif str(gen.get_definition()) == "master:source_3":
-            s_n_mva = float(gen.get_parameters()["Sbase"].split("[")[0].replace(" ", ""))
+# session of the gui, shared by all buttons
+pscad_session = PscadSession()
 
-            pinit_pu = pinit_mw / s_n_mva
-            qinit_pu = qinit_mvar / s_n_mva
 
-            gen.set_parameters(Pinit=pinit_pu, Qinit=qinit_pu, PhT=ph, Vpu=v_pu)
+# path of the selected project, None until a project is selected
+path = None
 
 
-def button_select_path():
+# sets path, directory and name of the project that gets used
+def select_project(project_path):
     global filename
     global directory
     global project_name
     global path
-    path = filedialog.askopenfilename()
+    path = project_path
     directory = os.path.dirname(path)
     filename = os.path.basename(path)
     project_name = os.path.splitext(filename)[0]
 
 
-def button_run():
-    global fortran_version
-    global main
-    global net
-    fortran_version = fcomp_var.get()
+def button_select_path():
+    select_project(filedialog.askopenfilename())
+
+
+# powerflow algorithms of pandapower that can be selected
+pf_algorithms = ("nr", "iwamoto_nr", "fdbx", "fdxb", "gs", "bfsw")
+
+
+# checks if an optional package is installed without importing it
+def package_installed(name):
+    return importlib.util.find_spec(name) is not None
+
+
+# returns the options for pp.runpp from the settings of a run. numba and lightsim2grid are only used if they are
+# installed
+def powerflow_options(run_settings):
+    options = {"calculate_voltage_angles": True, "init": run_settings["init"],
+               "max_iteration": run_settings["max_iteration"], "enforce_q_lims": run_settings["enforce_q_lims"],
+               "algorithm": run_settings["algorithm"], "numba": False, "lightsim2grid": False}
 
-    # launch pscad, silence: surpress dialogues, certificate: False = Legacy Licensing
-    pscad = mhrc.automation.launch_pscad(silence=True, minimize=True)
-    pscad.load(path)
-    project = pscad.project(project_name)
-    main = project.user_canvas("Main")
+    for package in ("numba", "lightsim2grid"):
+        if run_settings[package] and package_installed(package):
+            options[package] = True
+        elif run_settings[package] and package == "lightsim2grid":
+            print("Warning: lightsim2grid is not installed, using the pandapower solver")
 
-    # build project
-    if build_var.get():
-        pscad.settings(fortran_version=fortran_version)
-        pscad.build_current()
+    return options
 
-    # create PandaPower network with given frequency
-    net = pp.create_empty_network(f_hz=float(freq_ent.get()), add_stdtypes=False)
 
-    # create component lists
-    find_components()
+# solves a copy of a solved network with the default Newton-Raphson solver of pandapower and compares the bus results.
+# Returns the largest deviations and whether all of them are within the tolerances
+def validate_backend(solved_net, options, tolerance_pu=1E-5, tolerance_degree=1E-3, tolerance_mw=1E-3):
+    reference = copy.deepcopy(solved_net)
+    pp.runpp(net=reference, **dict(options, algorithm="nr", numba=False, lightsim2grid=False))
+
+    deviations = {column: float(np.nanmax(np.abs(solved_net.res_bus[column].values -
+                                                 reference.res_bus[column].values), initial=0.0))
+                  for column in ("vm_pu", "va_degree", "p_mw", "q_mvar")}
+    valid = (deviations["vm_pu"] <= tolerance_pu and deviations["va_degree"] <= tolerance_degree and
+             deviations["p_mw"] <= tolerance_mw and deviations["q_mvar"] <= tolerance_mw)
+    return deviations, valid
+
+
+# solves the network with one branch out of service. Returns the bus voltages and the loadings of all lines and trafos,
+# or None if the powerflow doesn't converge
+def solve_contingency(contingency_net, element, index, runpp_options):
+    contingency_net[element].at[index, "in_service"] = False
+    try:
+        pp.runpp(net=contingency_net, **runpp_options)
+        return (contingency_net.res_bus["vm_pu"].values,
+                np.concatenate([contingency_net.res_line["loading_percent"].values,
+                                contingency_net.res_trafo["loading_percent"].values]))
+    except pp.LoadflowNotConverged:
+        return None
+    finally:
+        contingency_net[element].at[index, "in_service"] = True
+
+
+# worker process of the contingency sweep. The base network is sent once per worker. After it's loaded, the worker
+# reports that it's ready and solves the outages it gets through its connection until it gets None
+def contingency_worker(net_json, runpp_options, connection):
+    contingency_net = pp.from_json_string(net_json)
+    connection.send(("ready", None, None))
+    while True:
+        task = connection.recv()
+        if task is None:
+            return
+
+        case, element, index = task
+        try:
+            connection.send(("done", case, solve_contingency(contingency_net, element, index, runpp_options)))
+        except Exception as e:
+            connection.send(("failed", case, repr(e)))
+
+
+# runs an N-1 contingency sweep: every line and trafo in service gets tripped one at a time and the rest of the network
+# is solved in parallel worker processes. Cases that run longer than timeout seconds get stopped. Returns one array of
+# bus voltages and one of branch loadings with a row per outage, NaN for cases without results.
+# Every worker has its own pipe and gets its cases one at a time, so a stopped or crashed worker only breaks its own
+# pipe and its case is known. A result it sent before it was stopped is never read
+def run_contingency_sweep(base_net, runpp_options, workers=None, timeout=60, outages=None):
+    if outages is None:
+        outages = ([("line", index) for index in base_net.line.index[base_net.line["in_service"]]] +
+                   [("trafo", index) for index in base_net.trafo.index[base_net.trafo["in_service"]]])
+    workers = min(workers or os.cpu_count(), len(outages)) or 1
+
+    vm_pu = np.full((len(outages), len(base_net.bus)), np.nan)
+    loading_percent = np.full((len(outages), len(base_net.line) + len(base_net.trafo)), np.nan)
+    status = np.full(len(outages), "not converged", dtype=object)
+    # the workers fill the result arrays in place
+    results = {"outages": outages, "bus": base_net.bus.index.values,
+               "branches": [("line", index) for index in base_net.line.index] +
+                           [("trafo", index) for index in base_net.trafo.index],
+               "vm_pu": vm_pu, "loading_percent": loading_percent, "status": status}
+
+    # without outages there is nothing to solve, so no worker is started
+    if not outages:
+        return results
+
+    context = multiprocessing.get_context("spawn")
+    pending = deque(enumerate(outages))
+    net_json = pp.to_json(base_net)
+    # connection -> worker state: its process, if it's ready and the case it solves with its start time
+    running = {}
+
+    def start_worker():
+        connection, worker_connection = context.Pipe()
+        process = context.Process(target=contingency_worker, args=(net_json, runpp_options, worker_connection),
+                                  daemon=True)
+        process.start()
+        worker_connection.close()
+        running[connection] = {"process": process, "ready": False, "case": None, "start": None}
+
+    def stop_worker(connection):
+        running.pop(connection)["process"].terminate()
+        connection.close()
+
+    # gives a worker its next case, it stays idle if there are none left
+    def assign_case(connection):
+        worker = running[connection]
+        worker["case"] = None
+        if pending:
+            case, (element, index) = pending.popleft()
+            connection.send((case, element, index))
+            worker["case"], worker["start"] = case, time.perf_counter()
+
+    for i in range(workers):
+        start_worker()
+
+    remaining = len(outages)
+    while remaining > 0:
+        for connection in multiprocessing.connection.wait(list(running), timeout=0.5):
+            worker = running[connection]
+            try:
+                message, case, result = connection.recv()
+            except EOFError:
+                # the worker died. If it couldn't even load the network, another one wouldn't either
+                worker["process"].join(1)
+                exitcode = worker["process"].exitcode
+                if not worker["ready"]:
+                    for other in list(running):
+                        stop_worker(other)
+                    raise RuntimeError("contingency worker exited with code %s before it was ready" % exitcode)
+
+                stop_worker(connection)
+                if worker["case"] is not None:
+                    status[worker["case"]] = "failed: worker exited with code %s" % exitcode
+                    remaining -= 1
+                if pending:
+                    start_worker()
+                continue
+
+            if message == "ready":
+                worker["ready"] = True
+            else:
+                remaining -= 1
+                if message == "failed":
+                    status[case] = "failed: " + result
+                elif result is not None:
+                    status[case] = "converged"
+                    vm_pu[case], loading_percent[case] = result
+            assign_case(connection)
+
+        # replace workers that are stuck in a case
+        for connection, worker in list(running.items()):
+            if worker["case"] is not None and time.perf_counter() - worker["start"] > timeout:
+                status[worker["case"]] = "timeout"
+                remaining -= 1
+                stop_worker(connection)
+                if pending:
+                    start_worker()
+
+    for connection, worker in running.items():
+        connection.send(None)
+        worker["process"].join()
+        connection.close()
+
+    return results
+
+
+# formats the PandaPower network can be exported in. parquet and feather need pyarrow
+export_formats = ("xlsx", "json", "parquet", "feather")
+# single background thread that writes the exports, so the run doesn't wait for them
+export_executor = ThreadPoolExecutor(max_workers=1)
+export_futures = []
+
+
+# writes a network with its results into a file or folder named basename plus the extension of the format. xlsx and
+# json are the files of pp.to_excel and pp.to_json, parquet and feather get one file per non-empty table in a folder
+def export_net(net_to_export, export_format, basename):
+    if export_format in ("parquet", "feather") and not package_installed("pyarrow"):
+        print("Warning: pyarrow is not installed, exporting as pandapower json")
+        export_format = "json"
+
+    if export_format == "xlsx":
+        pp.to_excel(net=net_to_export, filename=basename + ".xlsx")
+    elif export_format == "json":
+        pp.to_json(net_to_export, basename + ".json")
+    else:
+        folder = basename + "_" + export_format
+        os.makedirs(folder, exist_ok=True)
+        for table, df in net_to_export.items():
+            if not isinstance(df, pd.DataFrame) or df.empty:
+                continue
+
+            # pyarrow needs one type per column, so mixed object columns like names are written as strings
+            df = df.reset_index()
+            for column in df.columns[df.dtypes == object]:
+                df[column] = df[column].where(df[column].isna(), df[column].astype(str))
+            getattr(df, "to_" + export_format)(os.path.join(folder, table + "." + export_format))
+
+    return basename
+
+
+# exports a copy of the network on the background thread. Errors are printed, the run goes on without the export
+def start_export(export_format, basename):
+    def write(net_copy):
+        try:
+            export_net(net_copy, export_format, basename)
+        except Exception as e:
+            print("Warning: export of %s failed: %r" % (basename, e))
 
-    # create graph for electrical connections
-    create_network_graph()
+    export_futures.append(export_executor.submit(write, copy.deepcopy(net)))
 
-    # create PandaPower components
-    create_buses_from_pscad()
-    create_lines_from_pscad()
-    create_cap_banks_from_pscad()
-    create_loads_from_pscad()
-    create_trafos_from_pscad()
-    create_gens_from_pscad()
 
-    # export pandapower results into excel sheet. Before the powerflow analysis so in case it gives an error you can
-    # troubleshoot the inputs easier
-    if pp_excel_var.get():
-        pp.to_excel(net=net, filename=directory + "\\" + "pandapower_result.xlsx")
+# waits until all exports of the background thread are written
+def wait_for_exports():
+    wait(export_futures)
+    export_futures.clear()
 
+
+# component lists that make up the topology of the network. If one of them changes, the network gets rebuilt completely
+topology_lists = ("bus_list", "wire_list", "meter_list", "pin_list", "tline_list", "cable_list")
+
+# component lists whose elements can be updated in a saved network, with the functions that create their elements
+incremental_lists = {"trafo_list": create_trafos_from_pscad, "load_list": create_loads_from_pscad,
+                     "gen_list": create_gens_from_pscad, "cap_list": create_cap_banks_from_pscad}
+
+
+# files of the state of the previous run: the PandaPower network and the canvas it was built from
+def previous_run_files():
+    return (os.path.join(directory, project_name + "_previous_net.json"),
+            os.path.join(directory, project_name + "_previous_run.json.gz"))
+
+
+# everything besides the canvas the network depends on: the settings used to build it, the manual inputs and the .dta
+# and .out files of the lines and cables
+def run_fingerprint():
+    files = {}
+    folder = project_folder()
+    dta_names = sorted({"main.dta"} | {dta_name(branch) for branch in tline_list + cable_list})
+    for name in dta_names + [branch.get_parameters()["Name"] + ".out" for branch in tline_list + cable_list]:
+        try:
+            stat = os.stat(os.path.join(folder, name))
+            files[name] = [stat.st_mtime_ns, stat.st_size]
+        except (FileNotFoundError, TypeError):
+            files[name] = None
+
+    return {"settings": {key: settings[key] for key in ("freq", "slack_bus", "similar_bus_indices",
+                                                        "fortran_version")},
+            "man_input": hashlib.sha1(json.dumps(man_input.sheets, sort_keys=True, default=str).encode()).hexdigest(),
+            "files": files}
+
+
+# returns a hash of the snapshot data of every component in the given lists, by list and component id. The ids are
+# json strings, so the hashes can be saved with the state of the run
+def component_hashes(list_names):
+    hashes = {}
+    for list_name in list_names:
+        hashes[list_name] = {}
+        for component in globals()[list_name]:
+            data = json.dumps(component_data(list_name, component), sort_keys=True, default=int)
+            hashes[list_name][json.dumps(list(component._id), default=int)] = hashlib.sha1(data.encode()).hexdigest()
+
+    return hashes
+
+
+# compares the component hashes of the canvas with the state of the previous run. Returns the ids of the added and
+# removed components per list that can be updated in the saved network, a modified component is removed and added
+# again. Returns None if the network has to be rebuilt completely
+def diff_previous_run(previous, hashes, fingerprint):
+    if previous is None or previous["fingerprint"] != fingerprint:
+        return None
+
+    for list_name in topology_lists:
+        if previous["hashes"][list_name] != hashes[list_name]:
+            return None
+
+    changes = {}
+    for list_name in incremental_lists:
+        old = previous["hashes"][list_name]
+        new = hashes[list_name]
+        changes[list_name] = ([tuple(json.loads(key)) for key, value in new.items() if old.get(key) != value],
+                              [tuple(json.loads(key)) for key, value in old.items() if new.get(key) != value])
+
+    return changes
+
+
+# reads the state of the previous run. Returns None if there is none or it was saved by an older version without
+# component hashes
+def load_previous_run():
+    net_file, run_file = previous_run_files()
+    try:
+        with gzip.open(run_file, "rt") as fp:
+            previous = json.load(fp)
+    except (FileNotFoundError, ValueError):
+        return None
+
+    if "hashes" not in previous or not os.path.exists(net_file):
+        return None
+    return previous
+
+
+# state of the current run that gets saved for the next one: the component hashes, the fingerprint and whether the
+# network was built or changed. None if the run is a full rebuild
+previous_run_state = None
+
+
+# saves the state of the current run for the next one, after the results were written back. The sources are hashed
+# again, so the written back parameters don't count as changes in the next run. The network is only saved if it was
+# built or changed, otherwise the saved one is still the same
+def save_previous_run():
+    if previous_run_state is None:
+        return
+
+    net_file, run_file = previous_run_files()
+    if previous_run_state["net_changed"]:
+        pp.to_json(net, net_file)
+    hashes = dict(previous_run_state["hashes"], **component_hashes(["gen_list"]))
+    with gzip.open(run_file, "wt") as fp:
+        json.dump({"hashes": hashes, "fingerprint": previous_run_state["fingerprint"],
+                   "element_index": [[list(component_id), element, index]
+                                     for component_id, (element, index) in element_index.items()]},
+                  fp, separators=(",", ":"), default=int)
+
+
+# updates the network of the previous run with the changed components. The elements of removed and modified components
+# get dropped, then the added and modified components are created like in a full build
+def apply_canvas_changes(previous, changes):
+    global net
+    global bus_index
+    global element_index
+    net = pp.from_json(previous_run_files()[0])
+    bus_index = {str(name): index for index, name in net.bus["name"].items()}
+    element_index = {tuple(component_id): (element, index)
+                     for component_id, element, index in previous["element_index"]}
+
+    for list_name, (added, removed) in changes.items():
+        for component_id in removed:
+            element, index = element_index.pop(component_id)
+            net[element].drop(index, inplace=True)
+
+        if added:
+            added = set(added)
+            incremental_lists[list_name]([component for component in globals()[list_name]
+                                          if tuple(component._id) in added])
+
+    print("Incremental rebuild: " + ", ".join("%s %d added, %d removed" % (list_name, len(added), len(removed))
+                                               for list_name, (added, removed) in changes.items()))
+
+
+# default settings for a run, same as the defaults in the gui
+def default_settings():
+    return {"freq": 60.0, "slack_bus": "Bus1", "max_iteration": "auto", "init": "auto", "enforce_q_lims": False,
+            "similar_bus_indices": True, "excel": True, "export_format": "xlsx", "build": False, "fortran_version": None,
+            "parser_workers": os.cpu_count(), "contingency": False, "contingency_workers": os.cpu_count(),
+            "contingency_timeout": 60, "topology_cache": True, "incremental": False, "trace_memory": False,
+            "algorithm": "nr", "numba": True, "lightsim2grid": False, "validate_backend": False}
+
+
+# reads the settings for a run from the gui
+def read_gui_settings():
     # get max iterations for powerflow calculation from gui
     max_iteration = pp_it_ent.get()
     if max_iteration.isdigit():
         max_iteration = int(max_iteration)
 
-    # set if q-limits should get taken into account
-    enforce_q_lims = q_limit_var.get()
+    parser_workers = parser_workers_ent.get()
+    parser_workers = int(parser_workers) if parser_workers.isdigit() else os.cpu_count()
+
+    return dict(default_settings(), freq=float(freq_ent.get()), slack_bus=slack_ent.get(),
+                max_iteration=max_iteration, init=pp_init_ent.get(), enforce_q_lims=q_limit_var.get(),
+                similar_bus_indices=sim_bus_var.get(), excel=pp_excel_var.get(),
+                export_format=export_format_var.get(), build=build_var.get(),
+                fortran_version=fcomp_var.get(), parser_workers=parser_workers, contingency=contingency_var.get(),
+                algorithm=algorithm_var.get(), numba=numba_var.get(), lightsim2grid=lightsim_var.get(),
+                validate_backend=validate_var.get(), trace_memory=trace_memory_var.get())
+
+
+# builds the PandaPower network from the component lists and runs the powerflow analysis
+def build_and_solve():
+    global net
+    global man_input
+    global element_index
+    global previous_run_state
+    global contingency_results
+
+    # read manual inputs
+    with stage("read manual input"):
+        man_input = ManualInputStore(os.path.join(directory, "man_input.xlsx"))
+
+    # create graph for electrical connections. The graph is skipped if the canvas geometry is the same as in the
+    # topology cache
+    with stage("hash canvas geometry"):
+        edges, bus_ends = network_edges()
+        topology_key = topology_hash(edges, bus_ends)
+
+    with stage("load topology cache"):
+        cached = settings["topology_cache"] and load_topology_cache(topology_key)
+    run_report["topology_cache"] = "hit" if cached else "miss"
+
+    if not cached:
+        with stage("create network graph"):
+            create_network_graph(edges, bus_ends)
+
+    # buses of all component ports. The cache gets saved if the graph was built or new port locations were resolved
+    with stage("resolve ports"):
+        resolved_locations = len(location_bus)
+        resolve_ports()
+        if not cached or len(location_bus) > resolved_locations:
+            save_topology_cache(topology_key)
+
+    # compare the canvas with the previous run, only changed components need to be updated if the topology is the same.
+    # This is opt-in, loading the saved network takes longer than building small networks. A full rebuild neither reads
+    # nor saves the previous run, the saved one stays consistent with its own canvas
+    changes = None
+    previous_run_state = None
+    if settings["incremental"]:
+        with stage("diff previous run"):
+            hashes = component_hashes(snapshot_contents)
+            fingerprint = run_fingerprint()
+            previous = load_previous_run()
+            changes = diff_previous_run(previous, hashes, fingerprint)
+        previous_run_state = {"hashes": hashes, "fingerprint": fingerprint,
+                              "net_changed": changes is None or any(added or removed
+                                                                    for added, removed in changes.values())}
+
+    if changes is not None:
+        with stage("apply canvas changes"):
+            apply_canvas_changes(previous, changes)
+    else:
+        # create PandaPower network with given frequency
+        net = pp.create_empty_network(f_hz=settings["freq"], add_stdtypes=False)
+        # PSCAD component ids with the pandapower element type and index they are represented by
+        element_index = {}
+
+        # create PandaPower components
+        with stage("create buses"):
+            create_buses_from_pscad()
+        with stage("create lines"):
+            create_lines_from_pscad()
+        with stage("create cap banks"):
+            create_cap_banks_from_pscad()
+        with stage("create loads"):
+            create_loads_from_pscad()
+        with stage("create trafos"):
+            create_trafos_from_pscad()
+        with stage("create gens"):
+            create_gens_from_pscad()
 
     # run powerflow
-    pp.runpp(net=net, calculate_voltage_angles=True, init=pp_init_ent.get(), max_iteration=max_iteration,
-             enforce_q_lims=enforce_q_lims)
+    runpp_options = powerflow_options(settings)
+    try:
+        with stage("powerflow"):
+            pp.runpp(net=net, **runpp_options)
+    except Exception:
+        # export the pandapower inputs if the powerflow fails, so you can troubleshoot them easier
+        if settings["excel"]:
+            with stage("export of failed powerflow"):
+                export_net(net, settings["export_format"], os.path.join(directory, "pandapower_result"))
+        raise
+    run_report["powerflow"] = {"algorithm": runpp_options["algorithm"], "iterations": net._ppc.get("iterations")}
+    print("Powerflow: %s, %s iterations" % (runpp_options["algorithm"], net._ppc.get("iterations")))
+
+    # compare the results of the selected solver with the default solver
+    if settings["validate_backend"]:
+        with stage("validate solver"):
+            deviations, valid = validate_backend(net, runpp_options)
+        print(("Solver matches the default solver: " if valid else "Warning: solver deviates from the default solver: ") +
+              ", ".join("%s %.2e" % (column, deviation) for column, deviation in deviations.items()))
+
+    # export pandapower results on the background thread, the run only waits for it at the end
+    if settings["excel"]:
+        with stage("start export"):
+            start_export(settings["export_format"], os.path.join(directory, "pandapower_result"))
+
+    # trip every line, cable and trafo once and save the results of all cases
+    if settings["contingency"]:
+        with stage("contingency sweep"):
+            contingency_results = run_contingency_sweep(net, runpp_options, workers=settings["contingency_workers"],
+                                                        timeout=settings["contingency_timeout"])
+            np.savez(os.path.join(directory, "contingency_results.npz"),
+                     **{key: np.asarray(value, dtype=object if key in ("outages", "branches", "status") else None)
+                        for key, value in contingency_results.items()})
+        print("N-1: %d of %d cases converged" % (sum(contingency_results["status"] == "converged"),
+                                                 len(contingency_results["status"])))
+
+
+# events of the run in the worker thread for the gui: ("start", name) and ("done", record) of every stage and
+# ("finished", status) at the end of the run
+progress_queue = queue.Queue()
+
+
+# runs a project on the worker thread of the gui and reports how the run ended
+def gui_run_worker(project_path, run_settings):
+    try:
+        start_run_report(run_settings["trace_memory"])
+        run_pscad_project(pscad_session, project_path, run_settings)
+        progress_queue.put(("finished", "Run finished"))
+    except RunCancelled as e:
+        progress_queue.put(("finished", str(e)))
+    except Exception as e:
+        traceback.print_exc()
+        progress_queue.put(("finished", "Run failed: %r" % e))
+
+
+# shows the progress events of the worker thread in the gui. Polls the queue until the run is finished, then the
+# buttons are enabled again
+def poll_progress():
+    while True:
+        try:
+            event, data = progress_queue.get_nowait()
+        except queue.Empty:
+            break
+
+        if event == "start":
+            report_var.set("Running: " + data)
+        elif event == "done":
+            if data["peak_memory_mb"] is None:
+                report_var.set("%s: %.2f s" % (data["name"], data["seconds"]))
+            else:
+                report_var.set("%s: %.2f s, %.1f MB peak memory" % (data["name"], data["seconds"],
+                                                                     data["peak_memory_mb"]))
+        elif event == "finished":
+            report_var.set(data)
+            for button in run_buttons:
+                button.config(state="normal")
+            cancel_bt.config(state="disabled")
+            return
+
+    root.after(100, poll_progress)
+
+
+# starts a run on a worker thread, so the gui stays responsive. The buttons are disabled until the run is finished
+def button_run():
+    if not path:
+        report_var.set("Select a project first")
+        return
 
-    # export pandapower results into excel sheet. After the powerflow analysis to add results to it
-    if pp_excel_var.get():
-        pp.to_excel(net=net, filename=directory + "\\" + "pandapower_result.xlsx")
+    run_settings = read_gui_settings()
+    for button in run_buttons:
+        button.config(state="disabled")
+    cancel_bt.config(state="normal")
+    cancel_event.clear()
 
-    # transfer powerflow results into PSCAD
-    update_gens_in_pscad()
-    project.save()
+    threading.Thread(target=gui_run_worker, args=(path, run_settings), daemon=True).start()
+    root.after(100, poll_progress)
+
+
+# cancels the current run before its next stage
+def button_cancel():
+    cancel_event.set()
+    report_var.set("Cancelling...")
+
+
+# runs the program for a PSCAD project in a PSCAD session: reads the canvas, builds and solves the PandaPower network
+# and writes the results back into PSCAD. The stages are added to the run report started by the caller
+def run_pscad_project(session, project_path, run_settings):
+    global settings
+    settings = dict(run_settings)
+    # batch entries don't have to name a compiler, like in the gui GFortran 4.6.2 is used then
+    if not settings["fortran_version"]:
+        settings["fortran_version"] = "GFortran 4.6.2"
+    select_project(project_path)
+
+    try:
+        with stage("launch PSCAD"):
+            pscad = session.application()
+        with stage("load project"):
+            project = session.project(path)
+
+        # build project
+        if settings["build"]:
+            with stage("build project"):
+                # the session can have several projects loaded, build the selected one instead of the focused one
+                pscad.settings(fortran_version=settings["fortran_version"])
+                project.build()
+
+        # create component lists
+        with stage("find components"):
+            find_components(project)
+
+        build_and_solve()
+
+        # transfer powerflow results into PSCAD
+        with stage("update gens in PSCAD"):
+            update_gens_in_pscad()
+        with stage("save previous run"):
+            save_previous_run()
+        with stage("save project"):
+            project.save()
+        with stage("wait for export"):
+            wait_for_exports()
+    finally:
+        run_report["pscad_session"] = {"launches": session.launches, "loads": session.loads}
+        write_run_report()
+
+    print_rpc_counters()
     print("done")
 
 
+# builds and solves the PandaPower network from a canvas snapshot without PSCAD. The .dta and .out files are read from
+# the project folder in the directory of the snapshot
+def run_headless(snapshot_file, run_settings):
+    global settings
+    global directory
+    global project_name
+    start_run_report(run_settings["trace_memory"])
+    with stage("load canvas snapshot"):
+        snapshot = load_canvas_snapshot(snapshot_file)
+
+    settings = dict(run_settings)
+    if not settings["fortran_version"]:
+        settings["fortran_version"] = snapshot["fortran_version"]
+    directory = os.path.dirname(os.path.abspath(snapshot_file))
+    project_name = snapshot["project_name"]
+
+    try:
+        build_and_solve()
+        with stage("save previous run"):
+            save_previous_run()
+        with stage("wait for export"):
+            wait_for_exports()
+    finally:
+        write_run_report()
+    print("done")
+
+
+# reads a batch file. It's either a list of projects or an object with a list of "projects" and "defaults" for the
+# settings of all projects. Each project is a path to a PSCAD project or canvas snapshot, or an object with a "path" and
+# its own "settings". Returns a list of (path, settings)
+def read_batch_file(batch_file):
+    with open(batch_file, "r") as fp:
+        batch = json.load(fp)
+    if isinstance(batch, list):
+        batch = {"projects": batch}
+
+    defaults = dict(default_settings(), **batch.get("defaults", {}))
+    projects = []
+    for project in batch["projects"]:
+        if isinstance(project, str):
+            project = {"path": project}
+        projects.append((project["path"], dict(defaults, **project.get("settings", {}))))
+
+    return projects
+
+
+# runs one project of a batch and returns its status and run time for the summary. Canvas snapshots are run headless,
+# PSCAD projects get their own PSCAD instance
+def run_batch_project(project_path, run_settings):
+    start = time.perf_counter()
+    result = {"project": project_path, "status": "ok", "error": "", "converged": False}
+    try:
+        if project_path.endswith(".canvas.json.gz"):
+            run_headless(project_path, run_settings)
+        else:
+            start_run_report(run_settings["trace_memory"])
+            session = PscadSession()
+            try:
+                run_pscad_project(session, project_path, run_settings)
+            finally:
+                session.close()
+        result["converged"] = bool(net.converged)
+    except Exception as e:
+        result["status"] = "failed"
+        result["error"] = repr(e)
+
+    result["seconds"] = time.perf_counter() - start
+    return result
+
+
+# runs all projects of a batch file, every project in a new worker process. Writes a summary with status and run time
+# of each project
+def run_batch(batch_file, workers, summary_file):
+    projects = read_batch_file(batch_file)
+
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"),
+                             max_tasks_per_child=1) as pool:
+        futures = [pool.submit(run_batch_project, project_path, run_settings)
+                   for project_path, run_settings in projects]
+        results = []
+        for future, (project_path, run_settings) in zip(futures, projects):
+            try:
+                results.append(future.result())
+            except Exception as e:
+                # the worker process itself failed
+                results.append({"project": project_path, "status": "failed", "error": repr(e), "converged": False,
+                                "seconds": None})
+            print("%s: %s" % (project_path, results[-1]["status"]))
+
+    summary = {"seconds": time.perf_counter() - start, "projects": results}
+    with open(summary_file, "w") as fp:
+        json.dump(summary, fp, indent=4)
+
+    print("%d of %d projects done, summary written to %s"
+          % (sum(result["status"] == "ok" for result in results), len(results), summary_file))
+
+
+# exports the canvas of the selected project into a snapshot file next to the project, for runs without PSCAD
+def button_export_snapshot():
+    if not path:
+        report_var.set("Select a project first")
+        return
+
+    project = pscad_session.project(path)
+    find_components(project)
+    export_canvas_snapshot(os.path.join(directory, project_name + ".canvas.json.gz"), fcomp_var.get())
+    print("canvas snapshot created")
+
+
 def button_create_man_inp():
-    pscad = mhrc.automation.launch_pscad(silence=True, minimize=True)
-    pscad.load(path)
-    project = pscad.project(project_name)
-    main = project.user_canvas("Main")
+    find_components(pscad_session.project(path))
 
-    workbook = xlsxwriter.Workbook(directory + "\\" + "man_input.xlsx")
+    workbook = xlsxwriter.Workbook(os.path.join(directory, "man_input.xlsx"))
 
-    trafo_list = main.find_all("master:xfmr-3p2w")
     sheet_trafo = workbook.add_worksheet(name="trafo")
     sheet_trafo.write("A1", "Name")
     sheet_trafo.write("B1", "hv_bus")
@@ -791,32 +2279,30 @@ def button_create_man_inp():
     sheet_trafo.write("F1", "tap_pos")
     sheet_trafo.write("G1", "tap_neutral")
 
-    gen_list = main.find_all("master:source3") + main.find_all("master:source_3")
     sheet_gen = workbook.add_worksheet(name="gen")
     sheet_gen.write("A1", "Name")
     sheet_gen.write("B1", "Bus")
     sheet_gen.write("C1", "max_q_mvar")
     sheet_gen.write("D1", "min_q_mvar")
 
-    line_list = main.find_all("TLine") + main.find_all("Cable")
+    line_list = tline_list + cable_list
     sheet_line = workbook.add_worksheet(name="line")
     sheet_line.write("A1", "Name")
     sheet_line.write("B1", "max_i_ka")
 
-    load_list = main.find_all("master:fixed_load")
     sheet_load = workbook.add_worksheet(name="load")
     sheet_load.write("A1", "Name")
     sheet_load.write("B1", "Bus")
 
-    shunt_list = main.find_all("master:capacitor")
     sheet_cap_bank = workbook.add_worksheet(name="cap_bank")
     sheet_cap_bank.write("A1", "Name")
     sheet_cap_bank.write("B1", "Bus")
 
-    # setup sheets with names or ids from PSCAD components
+    # setup sheets with names or ids from PSCAD components. Components on module pages get the page in front, like the
+    # names of their elements
     for i, line in enumerate(line_list):
         name = line.get_parameters()["Name"]
-        sheet_line.write(i + 1, 0, name)
+        sheet_line.write(i + 1, 0, page_name(getattr(line, "page", "Main"), name))
 
     for i, trafo in enumerate(trafo_list):
         if trafo.get_parameters()["Name"]:
@@ -824,7 +2310,7 @@ def button_create_man_inp():
         else:
             name = trafo._id[0]
 
-        sheet_trafo.write(i + 1, 0, name)
+        sheet_trafo.write(i + 1, 0, page_name(getattr(trafo, "page", "Main"), name))
 
     for i, gen in enumerate(gen_list):
         if gen.get_parameters()["Name"]:
@@ -832,23 +2318,73 @@ def button_create_man_inp():
         else:
             name = gen._id[0]
 
-        sheet_gen.write(i + 1, 0, name)
+        sheet_gen.write(i + 1, 0, page_name(getattr(gen, "page", "Main"), name))
 
     for i, load in enumerate(load_list):
         name = load._id[0]
-        sheet_load.write(i + 1, 0, name)
+        sheet_load.write(i + 1, 0, page_name(getattr(load, "page", "Main"), name))
 
-    for i, cap_bank in enumerate(shunt_list):
+    for i, cap_bank in enumerate(cap_list):
         name = cap_bank._id[0]
-        sheet_cap_bank.write(i + 1, 0, name)
+        sheet_cap_bank.write(i + 1, 0, page_name(getattr(cap_bank, "page", "Main"), name))
 
     workbook.close()
-    pscad.quit()
     print("manual input template created")
 
 
+# compilers read from PSCAD on a background thread, the gui gets them from this queue. None if they couldn't be read
+compiler_queue = queue.Queue()
+# compiler selected in the gui until the compilers are read
+default_compiler = "GFortran 4.6.2"
+
+
+# reads the list of all installed fortran compilers on a background thread, so the gui doesn't wait for PSCAD
+def start_compiler_enumeration():
+    def enumerate_compilers():
+        try:
+            compiler_queue.put(mhrc_automation.controller().get_paramlist_names("fortran"))
+        except Exception as e:
+            print("Warning: fortran compilers could not be read: %r" % e)
+            compiler_queue.put(None)
+
+    threading.Thread(target=enumerate_compilers, daemon=True).start()
+    root.after(100, poll_compilers)
+
+
+# fills the compiler option menu once the list of compilers has been read. If they couldn't be read, the default stays
+def poll_compilers():
+    try:
+        fcomp_list = compiler_queue.get_nowait()
+    except queue.Empty:
+        root.after(100, poll_compilers)
+        return
+    if fcomp_list is None:
+        return
+
+    # remove all compilers except the supported ones 4.6.2 and 4.2.1
+    fcomp_list = [fcomp for fcomp in fcomp_list if fcomp in ("GFortran 4.6.2", "GFortran 4.2.1")]
+    if not fcomp_list:
+        print("Warning: neither GFortran 4.6.2 nor GFortran 4.2.1 is installed")
+        return
+
+    menu = fcomp_om["menu"]
+    menu.delete(0, "end")
+    for fcomp in fcomp_list:
+        menu.add_command(label=fcomp, command=tkinter._setit(fcomp_var, fcomp))
+    # a compiler the user selected in the meantime is kept. The default is only replaced if it isn't installed
+    if fcomp_var.get() == default_compiler and default_compiler not in fcomp_list:
+        fcomp_var.set(fcomp_list[0])
+
+
+# quits the PSCAD session together with the gui
+def close_gui():
+    pscad_session.close()
+    root.destroy()
+
+
 def main():
     global pp_excel_var
+    global export_format_var
     global pp_it_ent
     global pp_init_ent
     global freq_ent
@@ -857,6 +2393,21 @@ def main():
     global sim_bus_var
     global build_var
     global q_limit_var
+    global parser_workers_ent
+    global contingency_var
+    global algorithm_var
+    global numba_var
+    global lightsim_var
+    global validate_var
+    global trace_memory_var
+    global report_var
+    global report_label
+    global stage_listener
+    global root
+    global run_buttons
+    global cancel_bt
+    global fcomp_om
+    from tktooltip import ToolTip
 
     root = tkinter.Tk()
     root.title("PSCAD Loadflow initializer")
@@ -864,17 +2415,20 @@ def main():
     root.grid_rowconfigure((0, 1, 2, 3, 4, 5, 6, 7, 8, 9), weight=1)
     root.grid_columnconfigure((0, 1, 2, 3), weight=1)
 
-    # get list of all installed fortran compilers and remove all of them except the supported ones 4.6.2 and 4.2.1
-    fcomp_list = mhrc.automation.controller().get_paramlist_names("fortran")
-    for fcomp in fcomp_list:
-        if not fcomp == "GFortran 4.6.2" and not fcomp == "GFortran 4.2.1":
-            del fcomp
-
-    fcomp_var = tkinter.StringVar(value=fcomp_list[1])
+    # the installed fortran compilers are read after the window is shown, until then the default compiler is selected
+    fcomp_var = tkinter.StringVar(value=default_compiler)
     sim_bus_var = tkinter.BooleanVar()
     pp_excel_var = tkinter.BooleanVar()
+    export_format_var = tkinter.StringVar(value="xlsx")
     build_var = tkinter.BooleanVar()
     q_limit_var = tkinter.BooleanVar()
+    contingency_var = tkinter.BooleanVar()
+    algorithm_var = tkinter.StringVar(value="nr")
+    numba_var = tkinter.BooleanVar()
+    lightsim_var = tkinter.BooleanVar()
+    validate_var = tkinter.BooleanVar()
+    trace_memory_var = tkinter.BooleanVar()
+    report_var = tkinter.StringVar()
 
     # create button which starts the program to run a powerflow analysis
     run_bt = tkinter.Button(master=root, text="Run", command=button_run)
@@ -892,12 +2446,17 @@ def main():
     sim_bus_cb.select()
     ToolTip(sim_bus_cb, msg="If checked, use the same bus indices for PandaPower that are used in PSCAD bus names")
 
-    # create checkbox for making excel file from pandapower
-    pp_excel_cb = tkinter.Checkbutton(master=root, text="Create Excel file", variable=pp_excel_var, onvalue=True,
+    # create checkbox for exporting the pandapower data
+    pp_excel_cb = tkinter.Checkbutton(master=root, text="Export results", variable=pp_excel_var, onvalue=True,
                                       offvalue=False)
     pp_excel_cb.select()
     pp_excel_cb.grid(row=3, column=1, sticky="ew")
-    ToolTip(pp_excel_cb, msg="Create Excel file from PandaPower data")
+    ToolTip(pp_excel_cb, msg="Export PandaPower data with results. If the powerflow fails, the inputs are exported")
+
+    # create option menu to select the export format
+    export_format_om = tkinter.OptionMenu(root, export_format_var, *export_formats)
+    export_format_om.grid(row=6, column=3)
+    ToolTip(export_format_om, msg="Select export format. parquet and feather write one file per table and need pyarrow")
 
     # create checkbox for building project
     build_cb = tkinter.Checkbutton(master=root, text="Build project on launch", variable=build_var, onvalue=True,
@@ -910,6 +2469,33 @@ def main():
     q_lim_cb.grid(row=3, column=3, sticky="ew")
     ToolTip(q_lim_cb, msg="Consider Q limits for generators in powerflow calculation")
 
+    # create checkbox for running an N-1 contingency sweep after the powerflow calculation
+    contingency_cb = tkinter.Checkbutton(master=root, text="N-1 sweep", variable=contingency_var, onvalue=True,
+                                         offvalue=False)
+    contingency_cb.grid(row=5, column=2, sticky="ew")
+    ToolTip(contingency_cb, msg="Trip every line, cable and trafo once and solve the rest of the network")
+
+    # create checkboxes for the powerflow solver
+    numba_cb = tkinter.Checkbutton(master=root, text="Numba", variable=numba_var, onvalue=True, offvalue=False)
+    numba_cb.grid(row=6, column=0, sticky="ew")
+    numba_cb.select()
+    ToolTip(numba_cb, msg="Use numba to speed up the powerflow calculation, if it is installed")
+
+    lightsim_cb = tkinter.Checkbutton(master=root, text="lightsim2grid", variable=lightsim_var, onvalue=True,
+                                      offvalue=False)
+    lightsim_cb.grid(row=6, column=1, sticky="ew")
+    ToolTip(lightsim_cb, msg="Use the C++ solver of lightsim2grid for Newton-Raphson, if it is installed")
+
+    validate_cb = tkinter.Checkbutton(master=root, text="Validate solver", variable=validate_var, onvalue=True,
+                                      offvalue=False)
+    validate_cb.grid(row=6, column=2, sticky="ew")
+    ToolTip(validate_cb, msg="Solve the network again with the default solver and compare the results")
+
+    trace_memory_cb = tkinter.Checkbutton(master=root, text="Trace memory", variable=trace_memory_var, onvalue=True,
+                                          offvalue=False)
+    trace_memory_cb.grid(row=9, column=0, sticky="ew")
+    ToolTip(trace_memory_cb, msg="Record the peak memory of every stage in the run report, slows down the run")
+
     # create  entries for setting frequency for powerflow calculations
     freq_ent = tkinter.Entry(master=root, width=50)
     freq_ent.insert(0, "60")
@@ -944,20 +2530,60 @@ def main():
     pp_init_label = tkinter.Label(master=root, text="LF initialization")
     pp_init_label.grid(row=0, column=3)
 
+    # create entry for amount of workers that parse the line constant files
+    parser_workers_ent = tkinter.Entry(master=root, width=50)
+    parser_workers_ent.insert(0, "auto")
+    parser_workers_ent.grid(row=5, column=1)
+    ToolTip(parser_workers_ent,
+            msg='Enter amount of workers that read the TLine and Cable output files in parallel. Enter "auto" to use one per CPU core')
+    parser_workers_label = tkinter.Label(master=root, text="Parser workers")
+    parser_workers_label.grid(row=4, column=1)
+
     # create option menu to select fortran compiler
-    fcomp_om = tkinter.OptionMenu(root, fcomp_var, *fcomp_list)
+    fcomp_om = tkinter.OptionMenu(root, fcomp_var, fcomp_var.get())
     fcomp_om.grid(row=5, column=0)
     ToolTip(fcomp_om, msg="Select Fortran Compiler")
     fcomp_label = tkinter.Label(master=root, text="Compiler")
     fcomp_label.grid(row=4, column=0)
 
+    # create option menu to select the powerflow algorithm
+    algorithm_om = tkinter.OptionMenu(root, algorithm_var, *pf_algorithms)
+    algorithm_om.grid(row=5, column=3)
+    ToolTip(algorithm_om, msg="Select powerflow algorithm. View PandaPower documentation for further infomation")
+    algorithm_label = tkinter.Label(master=root, text="LF algorithm")
+    algorithm_label.grid(row=4, column=3)
+
+    # create button which exports the canvas for runs without PSCAD
+    export_bt = tkinter.Button(master=root, text="Export canvas snapshot", command=button_export_snapshot)
+    export_bt.grid(row=7, column=3, sticky="ew")
+    ToolTip(export_bt, msg="Save the canvas of the selected PSCAD file for headless runs without PSCAD")
+
+    # create label with a live summary of the stages of a run
+    report_label = tkinter.Label(master=root, textvariable=report_var, anchor="w")
+    report_label.grid(row=8, column=0, columnspan=3, sticky="ew")
+    ToolTip(report_label, msg="Current stage of the run. The full report is saved next to the project")
+    stage_listener = progress_queue.put
+
+    # create button which cancels the current run
+    cancel_bt = tkinter.Button(master=root, text="Cancel", command=button_cancel, state="disabled")
+    cancel_bt.grid(row=8, column=3, sticky="ew")
+    ToolTip(cancel_bt, msg="Stop the run before its next stage")
+    root.protocol("WM_DELETE_WINDOW", close_gui)
+
     # create button to select file path
     select_path_bt = tkinter.Button(master=root, text="Select path", command=button_select_path)
     select_path_bt.grid(row=7, column=0, sticky="ew")
     ToolTip(select_path_bt, msg="Select PSCAD file")
 
+    # buttons that are disabled while a run is in progress
+    run_buttons = [run_bt, man_inp_bt, export_bt, select_path_bt]
+
+    root.after(0, start_compiler_enumeration)
     root.mainloop()
 
 
 if __name__ == "__main__":
-    main()
+    if len(sys.argv) > 1:
+        run_command_line(sys.argv[1:])
+    else:
+        main()
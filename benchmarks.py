@@ -0,0 +1,625 @@
+import argparse
+import gzip
+import importlib.util
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandapower as pp
+
+# the loadflow script, loaded from its path because its file name has a space. It's registered as a module, so worker
+# processes started by its functions can import them again
+spec = importlib.util.spec_from_file_location("loadflow", os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                                                       "Source Code.py"))
+loadflow = importlib.util.module_from_spec(spec)
+sys.modules["loadflow"] = loadflow
+spec.loader.exec_module(loadflow)
+
+
+# writes a main.dta file with a given amount of branches for benchmarks. Every branch connects two nodes of its own
+def write_synthetic_dta(dtafile, n_branches):
+    with open(dtafile, "w") as fp:
+        fp.write("! Local Node Voltages\n")
+        for node in range(1, 2 * n_branches + 1):
+            fp.write("  %d  0.0  // Bus%d(%d)\n" % (node, (node + 1) // 2, node))
+
+        fp.write("! Local Branch Data\n")
+        for branch in range(1, n_branches + 1):
+            fp.write("! TL%d\n" % branch)
+            fp.write(" 1 0.0 0.0\n")
+            fp.write(" %d 0.0 0.0\n" % (2 * branch - 1))
+            fp.write(" %d 0.0 0.0\n" % (2 * branch))
+
+
+# compares looking up all branches through the DtaIndex with reading main.dta again for every lookup like it was done
+# before. The old way is only timed on a sample of branches because it's quadratic
+def benchmark_dta_index(n_branches=5000, n_sample=50):
+    with tempfile.TemporaryDirectory() as folder:
+        dtafile = os.path.join(folder, "main.dta")
+        write_synthetic_dta(dtafile, n_branches)
+
+        start = time.perf_counter()
+        dta = loadflow.DtaIndex(dtafile)
+        for branch in range(1, n_branches + 1):
+            node_1, node_2 = dta.get_branch_nodes("TL%d" % branch)
+            dta.node_bus[node_1], dta.node_bus[node_2]
+        index_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        for branch in range(1, n_sample + 1):
+            with open(dtafile, "r") as fp:
+                lines = fp.readlines()
+                for line in lines:
+                    if line.find(r"! TL%d" % branch) != -1:
+                        node_1 = lines[lines.index(line) + 2].split(" ")[1]
+                        node_2 = lines[lines.index(line) + 3].split(" ")[1]
+            with open(dtafile, "r") as fp:
+                for line in fp.readlines():
+                    if line.find(r"//") != -1 and line.split("0.0")[0].replace(" ", "") in (node_1, node_2):
+                        line.split(r"//")[1].lstrip().split("(")[0]
+        rescan_time = (time.perf_counter() - start) / n_sample * n_branches
+
+    print("main.dta with %d branches: index %.3f s, rescanning per branch %.3f s (extrapolated from %d)"
+          % (n_branches, index_time, rescan_time, n_sample))
+
+
+# writes a .out file with load flow rxb data and matrices of a three phase line, padded to the size of a real file. The
+# zero sequence rxb data can be added after the positive sequence
+def write_synthetic_out(outfile, freq=60.0, u_n_kv=230.0, s_n_mva=100.0, b_pu=0.789E-01, padding=300, r_pu=0.123E-02,
+                        x_pu=0.456E-01, zero_sequence=False):
+    with open(outfile, "w") as fp:
+        fp.write(" SEQUENCE COMPONENT DATA @ %.1f Hz:\n" % freq)
+        fp.write(" SERIES IMPEDANCE MATRIX (Z) [ohms/m]:\n")
+        for row in range(3):
+            fp.write("  0.1E-04,0.3E-03   0.2E-05,0.1E-03   0.2E-05,0.1E-03\n")
+        fp.write("\n SHUNT ADMITTANCE MATRIX (Y) [mhos/m]:\n")
+        for row in range(3):
+            fp.write("  0.0,0.3E-08   0.0,-0.1E-09   0.0,-0.1E-09\n")
+        for row in range(padding):
+            fp.write("  %d  0.1234567E-03  0.2345678E-03  0.3456789E-03  0.4567890E-03\n" % row)
+        fp.write(" LOAD FLOW RXB FORMATTED DATA @ %.1f Hz:\n" % freq)
+        fp.write(" -----\n\n")
+        fp.write(" Base of Per-Unit Quantities:  %.1f kV(L-L),  %.1f MVA\n" % (u_n_kv, s_n_mva))
+        fp.write("\n Positive Sequence\n -----\n\n")
+        fp.write(" Resistance Rsq [pu]:   %.3E\n" % r_pu)
+        fp.write(" Reactance Xsq [pu]:   %.3E\n" % x_pu)
+        fp.write(" Susceptance Bsq [pu]:   %.3E\n" % b_pu)
+        if zero_sequence:
+            fp.write("\n Zero Sequence\n -----\n\n")
+            fp.write(" Resistance R0 [pu]:   %.3E\n" % (3 * r_pu))
+            fp.write(" Reactance X0 [pu]:   %.3E\n" % (3 * x_pu))
+            fp.write(" Susceptance B0 [pu]:   %.3E\n" % (0.6 * b_pu))
+
+
+# reads the line parameters from the rxb data of a .out file like it was done before the single pass parser: the whole
+# file is read and every value is looked up by the index of its header line
+def read_line_parameters_by_index(outfile, length_km):
+    with open(outfile, "r") as fp:
+        lines = fp.readlines()
+
+    for line in lines:
+        if line.find("LOAD FLOW RXB FORMATTED DATA") != -1:
+            freq = float(line.replace(" ", "").replace("LOADFLOWRXBFORMATTEDDATA@", "").replace("Hz:", ""))
+            w = 2 * np.pi * freq
+            U_n = float(lines[lines.index(line) + 3].replace(" ", "").split(",")[0]
+                        .replace("BaseofPer-UnitQuantities:", "").replace("kV(L-L)", "")) * 1E3
+            S_n = float(lines[lines.index(line) + 3].replace(" ", "").split(",")[1].replace("MVA", "")) * 1E6
+
+    for line in lines:
+        if line.strip() == "Positive Sequence":
+            R_pu = float(lines[lines.index(line) + 3].replace(" ", "").replace(r"ResistanceRsq[pu]:", ""))
+            X_pu = float(lines[lines.index(line) + 4].replace(" ", "").replace(r"ReactanceXsq[pu]:", ""))
+            B_pu = float(lines[lines.index(line) + 5].replace(" ", "").replace(r"SusceptanceBsq[pu]:", ""))
+
+            r_ohm_per_km = R_pu * (U_n ** 2) / S_n / length_km
+            x_ohm_per_km = X_pu * (U_n ** 2) / S_n / length_km
+            c_nf_per_km = B_pu * S_n / (U_n ** 2) / length_km / w * 1E9
+
+    return r_ohm_per_km, x_ohm_per_km, c_nf_per_km
+
+
+# writes .out files with different frequencies, bases, rxb values, paddings and with or without zero sequence data and
+# checks that the single pass parser gives the same line parameters as reading them by line index
+def check_line_constants(n_files=48):
+    mismatches = []
+    with tempfile.TemporaryDirectory() as folder:
+        for i in range(n_files):
+            outfile = os.path.join(folder, "TL%d.out" % i)
+            length_km = 0.5 + i
+            write_synthetic_out(outfile, freq=(50.0, 60.0)[i % 2], u_n_kv=(13.8, 110.0, 230.0, 500.0)[i % 4],
+                                s_n_mva=(10.0, 100.0, 1000.0)[i % 3], b_pu=0.789E-01 / (i + 1),
+                                padding=(0, 10, 300)[i % 3], r_pu=0.123E-02 * (i + 1), x_pu=0.456E-01 + 1E-3 * i,
+                                zero_sequence=i % 4 >= 2)
+
+            expected = read_line_parameters_by_index(outfile, length_km)
+            parsed = loadflow.line_parameters(loadflow.read_line_constants(outfile), length_km)
+            if not np.allclose(parsed, expected, rtol=1E-12, atol=0):
+                mismatches.append((outfile, parsed, expected))
+
+    for outfile, parsed, expected in mismatches:
+        print("%s: parsed %s, expected %s" % (os.path.basename(outfile), parsed, expected))
+    print("Line constants of %d .out files: %d mismatches" % (n_files, len(mismatches)))
+    return not mismatches
+
+
+# compares parsing .out files serially with thread and process pools of different sizes
+def benchmark_line_constant_extraction(n_files=500, worker_counts=(2, 4, 8)):
+    with tempfile.TemporaryDirectory() as folder:
+        outfiles = [os.path.join(folder, "TL%d.out" % i) for i in range(n_files)]
+        for outfile in outfiles:
+            write_synthetic_out(outfile)
+
+        start = time.perf_counter()
+        loadflow.extract_line_constants(outfiles)
+        print("%d .out files serial: %.3f s" % (n_files, time.perf_counter() - start))
+
+        for processes in (False, True):
+            for workers in worker_counts:
+                start = time.perf_counter()
+                loadflow.extract_line_constants(outfiles, workers=workers, processes=processes)
+                print("%d .out files, %d %s: %.3f s" % (n_files, workers, "processes" if processes else "threads",
+                                                        time.perf_counter() - start))
+
+
+# element tables of a synthetic network for benchmarks. The buses form a chain with a line between neighbours and
+# every tenth bus is also connected to the bus ten places before it. Every bus has a load, every tenth bus a generator
+# and the first bus is the slack
+def synthetic_net_elements(n_buses):
+    names = ["Bus%d" % i for i in range(1, n_buses + 1)]
+    lines = [(names[i], names[i + 1]) for i in range(n_buses - 1)]
+    lines += [(names[i - 10], names[i]) for i in range(10, n_buses, 10)]
+    gens = names[10::10]
+    return names, lines, gens
+
+
+# builds a synthetic network with the bulk creation functions of pandapower
+def create_synthetic_net(n_buses):
+    names, lines, gens = synthetic_net_elements(n_buses)
+    synthetic_net = pp.create_empty_network(add_stdtypes=False)
+    index = dict(zip(names, pp.create_buses(net=synthetic_net, nr_buses=n_buses, vn_kv=230.0, name=names)))
+    pp.create_lines_from_parameters(net=synthetic_net, from_buses=[index[line[0]] for line in lines],
+                                    to_buses=[index[line[1]] for line in lines], length_km=1.0, r_ohm_per_km=0.05,
+                                    x_ohm_per_km=0.4, c_nf_per_km=10.0, max_i_ka=1.0,
+                                    name=["Line%d" % i for i in range(len(lines))])
+    pp.create_loads(net=synthetic_net, buses=list(index.values()), p_mw=1.0, q_mvar=0.2, name=names)
+    if gens:
+        pp.create_gens(net=synthetic_net, buses=[index[gen] for gen in gens], p_mw=9.0, vm_pu=1.0, name=gens)
+    pp.create_ext_grid(net=synthetic_net, bus=index[names[0]], vm_pu=1.0, name="Grid")
+    return synthetic_net
+
+
+# writes a synthetic PSCAD project with the network of synthetic_net_elements into a folder: a canvas snapshot that can
+# be run headless and the main.dta and .out files of the lines. The 230 kV buses are laid out on a grid, each with a
+# load and the generators wired to them. Every fifth bus has a cap bank, every twentieth bus a trafo to an own 110 kV
+# bus with a load and every generator is connected through a multimeter. Returns the file name of the snapshot
+def write_synthetic_project(folder, n_buses, name="synthetic", fortran_version="GFortran 4.6.2"):
+    names, lines, gens = synthetic_net_elements(n_buses)
+    gens = [names[0]] + gens
+    components = {list_name: [] for list_name in loadflow.snapshot_contents}
+    ids = iter(range(1, 10 * n_buses + 100))
+
+    def add(list_name, location, vertices=None, parameters=None, ports=None, definition=None):
+        data = {"id": [next(ids), 0], "location": list(location)}
+        if vertices is not None:
+            data["vertices"] = [list(vertex) for vertex in vertices]
+        if parameters is not None:
+            data["parameters"] = parameters
+        if ports is not None:
+            data["ports"] = {port: list(location) for port, location in ports.items()}
+        if definition is not None:
+            data["definition"] = definition
+        components[list_name].append(data)
+
+    def add_bus(bus_name, base_kv, x, y, length):
+        add("bus_list", (x, y), [(0, 0), (length, 0)], {"Name": bus_name, "BaseKV": "%g [kV]" % base_kv})
+
+    def add_wire(start, end):
+        add("wire_list", start, [(0, 0), (end[0] - start[0], end[1] - start[1])])
+
+    def add_load(x, y):
+        add_wire((x, y), (x, y + 50))
+        add("load_list", (x, y + 50), parameters={"PO": "%.6f [MW]" % (1 / 3), "QO": "%.6f [MVAR]" % (0.2 / 3)},
+            ports={"IA": (x, y + 50)})
+
+    columns = int(np.ceil(np.sqrt(n_buses)))
+    lv_buses = []
+    for i, bus_name in enumerate(names):
+        x, y = 400 * (i % columns), 400 * (i // columns)
+        add_bus(bus_name, 230, x, y, 100)
+        add_load(x + 50, y)
+
+        if bus_name in gens:
+            add_wire((x + 50, y), (x + 50, y - 20))
+            add("meter_list", (x + 50, y - 20), ports={"A": (x + 50, y - 20), "B": (x + 50, y - 30)})
+            add_wire((x + 50, y - 30), (x + 50, y - 50))
+            add("gen_list", (x + 50, y - 50), parameters={"Name": "G" + bus_name, "Pinit": "10.5", "Vpu": "1.0",
+                                                          "PhT": "0", "Sbase": "100 [MVA]"},
+                ports={"N": (x + 50, y - 50)}, definition="master:source_3")
+
+        if i % 5 == 4:
+            add_wire((x + 20, y), (x + 20, y + 50))
+            add("cap_list", (x + 20, y + 50), parameters={"C": "0.1 [uF]"},
+                ports={"A": (x + 20, y + 50), "B": (x + 20, y + 100)})
+
+        if i % 20 == 19:
+            lv_buses.append("Bus%d" % (n_buses + len(lv_buses) + 1))
+            add_wire((x + 80, y), (x + 80, y + 50))
+            add("trafo_list", (x + 80, y + 50),
+                parameters={"Name": "T%d" % len(lv_buses), "YD1": "0", "YD2": "0", "Tap": "0", "Tmva": "100 [MVA]",
+                            "V1": "110 [kV]", "V2": "230 [kV]", "Lead": "1", "CuL": "0.002", "Xl": "0.1",
+                            "NLL": "0.001", "Im1": "0.5"},
+                ports={"N1": (x + 80, y + 100), "N2": (x + 80, y + 50)})
+            add_wire((x + 80, y + 100), (x + 80, y + 200))
+            add_bus(lv_buses[-1], 110, x + 60, y + 200, 40)
+            add_load(x + 90, y + 200)
+
+    # lines are connected through the nodes in main.dta, one node per bus
+    for j, (from_bus, to_bus) in enumerate(lines, 1):
+        add("tline_list", (0, 0), parameters={"Name": "TL%d" % j, "Length": "10 [km]"})
+
+    snapshot_file = os.path.join(folder, name + ".canvas.json.gz")
+    with gzip.open(snapshot_file, "wt") as fp:
+        json.dump({"project_name": name, "fortran_version": fortran_version, "components": components}, fp,
+                  separators=(",", ":"))
+
+    project_folder = os.path.join(folder, name + (".gf42" if fortran_version == "GFortran 4.2.1" else ".gf46"))
+    os.makedirs(project_folder, exist_ok=True)
+    node = {bus_name: k for k, bus_name in enumerate(names + lv_buses, 1)}
+    with open(os.path.join(project_folder, "main.dta"), "w") as fp:
+        fp.write("! Local Node Voltages\n")
+        for bus_name, k in node.items():
+            fp.write("  %d  0.0  // %s(%d)\n" % (k, bus_name, k))
+
+        fp.write("! Local Branch Data\n")
+        for j, (from_bus, to_bus) in enumerate(lines, 1):
+            fp.write("! TL%d\n 1 0.0 0.0\n %d 0.0 0.0\n %d 0.0 0.0\n" % (j, node[to_bus], node[from_bus]))
+
+    for j in range(1, len(lines) + 1):
+        write_synthetic_out(os.path.join(project_folder, "TL%d.out" % j), b_pu=0.002, padding=10)
+
+    return snapshot_file
+
+
+# builds and solves synthetic projects of different sizes headless and prints how long each stage of the run takes.
+# The stage times per size can be saved to a json file to compare them between versions
+def benchmark_scaling(sizes=(10, 100, 1000, 10000), report_file=None):
+    stage_times = {}
+    for n_buses in sizes:
+        with tempfile.TemporaryDirectory() as folder:
+            start = time.perf_counter()
+            snapshot_file = write_synthetic_project(folder, n_buses)
+            generate_time = time.perf_counter() - start
+
+            try:
+                loadflow.run_headless(snapshot_file, dict(loadflow.default_settings(), excel=False,
+                                                          incremental=False))
+            except pp.LoadflowNotConverged:
+                print("Powerflow with %d buses did not converge" % n_buses)
+            stage_times[n_buses] = dict({"generate project": generate_time},
+                                        **{record["name"]: record["seconds"]
+                                           for record in loadflow.run_report["stages"]})
+
+    stages = list(dict.fromkeys(name for times in stage_times.values() for name in times))
+    print("%-30s" % "stage [s] / buses" + "".join("%12d" % n_buses for n_buses in sizes))
+    for name in stages:
+        print("%-30s" % name + "".join("%12.3f" % stage_times[n_buses].get(name, np.nan) for n_buses in sizes))
+
+    if report_file:
+        with open(report_file, "w") as fp:
+            json.dump(stage_times, fp, indent=2)
+
+
+# compares building a synthetic network element by element with name lookups in the bus table, like it was done
+# before, with the bulk creation functions and a name registry
+def benchmark_pandapower_build(n_buses=10000):
+    names, lines, gens = synthetic_net_elements(n_buses)
+
+    start = time.perf_counter()
+    single_net = pp.create_empty_network(add_stdtypes=False)
+    for name in names:
+        pp.create_bus(net=single_net, vn_kv=230.0, name=name)
+    for i, line in enumerate(lines):
+        pp.create_line_from_parameters(net=single_net, from_bus=pp.get_element_index(single_net, "bus", line[0]),
+                                       to_bus=pp.get_element_index(single_net, "bus", line[1]), length_km=1.0,
+                                       r_ohm_per_km=0.05, x_ohm_per_km=0.4, c_nf_per_km=10.0, max_i_ka=1.0,
+                                       name="Line%d" % i)
+    for name in names:
+        pp.create_load(net=single_net, bus=pp.get_element_index(single_net, "bus", name), p_mw=1.0, q_mvar=0.2,
+                       name=name)
+    for gen in gens:
+        pp.create_gen(net=single_net, bus=pp.get_element_index(single_net, "bus", gen), p_mw=9.0, vm_pu=1.0, name=gen)
+    single_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    create_synthetic_net(n_buses)
+    bulk_time = time.perf_counter() - start
+
+    print("pandapower build with %d buses: element by element %.3f s, bulk %.3f s" % (n_buses, single_time, bulk_time))
+
+
+# runs a part of the N-1 contingency sweep on synthetic networks of different sizes with different amounts of workers
+def benchmark_contingency_sweep(sizes=(100, 1000), worker_counts=(1, 2, 4), n_outages=100):
+    for n_buses in sizes:
+        synthetic_net = create_synthetic_net(n_buses)
+        pp.runpp(net=synthetic_net)
+        outages = [("line", index) for index in synthetic_net.line.index[:n_outages]]
+        for workers in worker_counts:
+            start = time.perf_counter()
+            loadflow.run_contingency_sweep(synthetic_net, {}, workers=workers, outages=outages)
+            print("N-1 sweep with %d buses, %d outages, %d workers: %.3f s"
+                  % (n_buses, len(outages), workers, time.perf_counter() - start))
+
+
+# solves synthetic networks of different sizes with every powerflow algorithm, with numba and with lightsim2grid if they
+# are installed. Prints solve time and iterations and compares the results with the default solver. Gauss-Seidel needs
+# thousands of iterations, so it only runs up to gs_max_buses
+def benchmark_powerflow_backends(sizes=(100, 1000, 10000), gs_max_buses=100):
+    backends = [(algorithm, {"algorithm": algorithm}) for algorithm in loadflow.pf_algorithms]
+    if loadflow.package_installed("numba"):
+        backends.append(("nr + numba", {"algorithm": "nr", "numba": True}))
+    if loadflow.package_installed("lightsim2grid"):
+        backends.append(("nr + lightsim2grid", {"algorithm": "nr", "lightsim2grid": True}))
+
+    for n_buses in sizes:
+        synthetic_net = create_synthetic_net(n_buses)
+        for name, backend in backends:
+            if backend["algorithm"] == "gs" and n_buses > gs_max_buses:
+                continue
+
+            options = dict({"calculate_voltage_angles": True, "numba": False, "lightsim2grid": False}, **backend)
+            start = time.perf_counter()
+            try:
+                pp.runpp(net=synthetic_net, **options)
+            except Exception as e:
+                print("Powerflow %s with %d buses failed: %r" % (name, n_buses, e))
+                continue
+            seconds = time.perf_counter() - start
+
+            deviations, valid = loadflow.validate_backend(synthetic_net, options)
+            print("Powerflow %s with %d buses: %.3f s, %s iterations, max vm_pu deviation %.2e%s"
+                  % (name, n_buses, seconds, synthetic_net._ppc.get("iterations"), deviations["vm_pu"],
+                     "" if valid else " (outside tolerance)"))
+
+
+# imports this script in a new interpreter with -X importtime and prints the slowest imports. Returns False if the
+# import takes longer than the budget in seconds
+def check_startup_time(budget=1.0, n_slowest=10):
+    code = ("import importlib.util, sys; spec = importlib.util.spec_from_file_location('startup_check', sys.argv[1]); "
+            "spec.loader.exec_module(importlib.util.module_from_spec(spec))")
+    start = time.perf_counter()
+    process = subprocess.run([sys.executable, "-X", "importtime", "-c", code, os.path.abspath(loadflow.__file__)],
+                             capture_output=True, text=True)
+    seconds = time.perf_counter() - start
+
+    # lines are "import time: self [us] | cumulative | imported package", the stderr of the import comes in between
+    imports = []
+    for line in process.stderr.splitlines():
+        if line.startswith("import time:") and "|" in line and "cumulative" not in line:
+            self_us, cumulative_us, package = line[len("import time:"):].split("|")
+            imports.append((int(cumulative_us), package.rstrip()))
+
+    if process.returncode != 0:
+        print(process.stderr[-2000:])
+        print("Startup failed")
+        return False
+
+    print("Slowest imports [s]:")
+    for cumulative_us, package in sorted(imports, reverse=True)[:n_slowest]:
+        print("%8.3f %s" % (cumulative_us / 1E6, package))
+    print("Startup took %.3f s, budget %.3f s" % (seconds, budget))
+    return seconds <= budget
+
+
+# stand-in for a PSCAD canvas, made of snapshot components and module instances
+class StandInCanvas:
+    def __init__(self, components):
+        self.components = components
+
+    def find_all(self):
+        return self.components
+
+
+# stand-in for a module instance on a canvas
+class StandInModule(loadflow.OfflineComponent):
+    def is_module(self):
+        return True
+
+
+# stand-in for a PSCAD project with user canvases by name
+class StandInProject:
+    def __init__(self, canvases):
+        self.canvases = canvases
+
+    def user_canvas(self, name):
+        return self.canvases[name]
+
+    def build(self):
+        pass
+
+    def save(self):
+        pass
+
+
+# stand-in for a launched PSCAD that has the same project for every name. It answers the given amount of calls to
+# list_projects, or all of them if answers is None, afterwards it doesn't respond anymore
+class StandInPscad:
+    def __init__(self, project):
+        self._project = project
+        self.loaded = set()
+        self.answers = None
+
+    def list_projects(self):
+        if self.answers is not None:
+            if self.answers <= 0:
+                raise ConnectionError("PSCAD doesn't respond")
+            self.answers -= 1
+        return [{"name": name} for name in self.loaded]
+
+    def load(self, project_path):
+        self.loaded.add(os.path.splitext(os.path.basename(project_path))[0])
+
+    def project(self, name):
+        return self._project
+
+    def settings(self, **settings):
+        pass
+
+    def quit(self):
+        pass
+
+
+# stand-in for the PSCAD automation library. Every launch starts a new stand-in PSCAD
+class StandInAutomation:
+    def __init__(self, project):
+        self.project = project
+        self.launched = []
+
+    def launch_pscad(self, **options):
+        self.launched.append(StandInPscad(self.project))
+        return self.launched[-1]
+
+
+# builds a stand-in project with a module that is placed twice on the main canvas. The module has a port to the main
+# bus, a trafo to its own bus and a load and a source on that bus
+def module_instance_project():
+    ids = iter(range(1, 100))
+
+    def component(definition, location, vertices=None, parameters=None, ports=None,
+                  component_type=loadflow.OfflineComponent):
+        return component_type({"id": [next(ids), 0], "location": list(location), "definition": definition,
+                               "vertices": vertices or [], "parameters": parameters or {}, "ports": ports or {}})
+
+    def wire(start, end):
+        return component("WireOrthogonal", start, [(0, 0), (end[0] - start[0], end[1] - start[1])])
+
+    main_canvas = [component("Bus", (0, 0), [(0, 0), (200, 0)], {"Name": "Bus1", "BaseKV": "230 [kV]"}),
+                   wire((50, 0), (50, -50)),
+                   component("master:source_3", (50, -50), parameters={"Name": "G1", "Pinit": "0", "Vpu": "1.0",
+                                                                        "PhT": "0", "Sbase": "100 [MVA]"},
+                             ports={"N": (50, -50)})]
+    for x in (100, 150):
+        main_canvas += [wire((x, 0), (x, 100)),
+                        component("project:sub", (x, 100), ports={"P": (x, 100)}, component_type=StandInModule)]
+
+    sub_canvas = [component("master:port", (0, 0), parameters={"Name": "P"}), wire((0, 0), (0, 50)),
+                  component("master:xfmr-3p2w", (0, 50),
+                            parameters={"Name": "T1", "YD1": "0", "YD2": "0", "Tap": "0", "Tmva": "100 [MVA]",
+                                        "V1": "110 [kV]", "V2": "230 [kV]", "Lead": "1", "CuL": "0.002", "Xl": "0.1",
+                                        "NLL": "0.001", "Im1": "0.5"},
+                            ports={"N1": (0, 100), "N2": (0, 50)}),
+                  wire((0, 100), (0, 200)),
+                  component("Bus", (-20, 200), [(0, 0), (40, 0)], {"Name": "Bus2", "BaseKV": "110 [kV]"}),
+                  wire((10, 200), (10, 250)),
+                  component("master:fixed_load", (10, 250), parameters={"PO": "1 [MW]", "QO": "0.2 [MVAR]"},
+                            ports={"IA": (10, 250)}),
+                  wire((-10, 200), (-10, 150)),
+                  component("master:source_3", (-10, 150), parameters={"Name": "G2", "Pinit": "1", "Vpu": "1.0",
+                                                                        "PhT": "0", "Sbase": "100 [MVA]"},
+                            ports={"N": (-10, 150)})]
+
+    return StandInProject({"Main": StandInCanvas(main_canvas), "sub": StandInCanvas(sub_canvas)})
+
+
+# builds and solves the project with the module instances without PSCAD and checks that every instance gets its own
+# buses and elements
+def check_module_instances():
+    with tempfile.TemporaryDirectory() as folder:
+        loadflow.settings = dict(loadflow.default_settings(), excel=False, incremental=False,
+                                 fortran_version="GFortran 4.6.2")
+        loadflow.directory = folder
+        loadflow.project_name = "modules"
+        loadflow.start_run_report()
+        loadflow.find_components(module_instance_project(), workers=4)
+        loadflow.build_and_solve()
+        loadflow.update_gens_in_pscad()
+
+    net = loadflow.net
+    checks = {"buses of both instances": len(net.bus) == 3 and net.bus["name"].is_unique,
+              "loads on different buses": len(net.load) == 2 and net.load["bus"].is_unique,
+              "trafos to different buses": len(net.trafo) == 2 and net.trafo["lv_bus"].is_unique,
+              "element names per instance": all(net[element]["name"].is_unique for element in ("trafo", "load", "gen")),
+              "powerflow converged": bool(net.converged),
+              "shared sources not written back": loadflow.run_report["writeback"]["shared"] == 2}
+    for check, passed in checks.items():
+        print("%s: %s" % (check, "ok" if passed else "FAILED"))
+    return all(checks.values())
+
+
+# runs the project with the module instances several times in one PSCAD session with a stand-in PSCAD. Two runs have to
+# share one launch and load. If PSCAD stops responding before a run or between the launch and the load of the project,
+# it has to be launched and the project loaded again
+def check_pscad_session():
+    automation = StandInAutomation(module_instance_project())
+    session = loadflow.PscadSession()
+    mhrc_automation = loadflow.mhrc_automation
+    loadflow.mhrc_automation = automation
+    checks = {}
+    try:
+        with tempfile.TemporaryDirectory() as folder:
+            project_path = os.path.join(folder, "session.pscx")
+            run_settings = dict(loadflow.default_settings(), excel=False, fortran_version="GFortran 4.6.2")
+            for answers, launches, check in ((None, 1, "first run"), (None, 1, "second run reuses the session"),
+                                             (0, 2, "relaunch if PSCAD doesn't respond"),
+                                             (1, 3, "relaunch if PSCAD stops responding before the load")):
+                if automation.launched:
+                    automation.launched[-1].answers = answers
+                loadflow.start_run_report()
+                loadflow.run_pscad_project(session, project_path, run_settings)
+                checks[check] = (session.launches == session.loads == launches
+                                 and loadflow.run_report["pscad_session"] == {"launches": launches, "loads": launches})
+    finally:
+        loadflow.mhrc_automation = mhrc_automation
+
+    for check, passed in checks.items():
+        print("%s: %s" % (check, "ok" if passed else "FAILED"))
+    return all(checks.values())
+
+
+def run_benchmarks():
+    benchmark_dta_index()
+    benchmark_line_constant_extraction()
+    benchmark_pandapower_build()
+    benchmark_contingency_sweep()
+    benchmark_powerflow_backends()
+    benchmark_scaling()
+
+
+# runs the benchmarks and checks of the loadflow script from the command line
+def run_command_line(args):
+    parser = argparse.ArgumentParser(prog="PSCAD Loadflow initializer benchmarks")
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("benchmark", help="run benchmarks")
+    startup = commands.add_parser("startup", help="check that the script starts within a time budget")
+    startup.add_argument("--budget", type=float, default=1.0, help="maximal startup time in seconds")
+    commands.add_parser("modules", help="check a project with a module placed twice, without PSCAD")
+    commands.add_parser("session", help="check that runs share one PSCAD session, with a stand-in PSCAD")
+    commands.add_parser("outfiles", help="check the .out file parser against reading the files by line index")
+    scaling = commands.add_parser("scaling", help="run synthetic projects of different sizes and time every stage")
+    scaling.add_argument("--sizes", type=int, nargs="+", default=[10, 100, 1000, 10000], help="amounts of buses")
+    scaling.add_argument("--report", help="json file for the stage times per size")
+    args = parser.parse_args(args)
+
+    if args.command == "benchmark":
+        run_benchmarks()
+    elif args.command == "startup":
+        if not check_startup_time(args.budget):
+            sys.exit(1)
+    elif args.command == "modules":
+        if not check_module_instances():
+            sys.exit(1)
+    elif args.command == "session":
+        if not check_pscad_session():
+            sys.exit(1)
+    elif args.command == "outfiles":
+        if not check_line_constants():
+            sys.exit(1)
+    elif args.command == "scaling":
+        benchmark_scaling(args.sizes, args.report)
+
+
+if __name__ == "__main__":
+    run_command_line(sys.argv[1:])